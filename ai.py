@@ -4,7 +4,9 @@ AI module - Rust-accelerated wrapper.
 Delegates heavy search to the Rust minichess_engine module while maintaining
 the same Python API for compatibility with gui.py, play_online.py, etc.
 """
+import functools
 import time
+import threading
 import minichess_engine as _rs
 
 from config import BOARD_SIZE
@@ -33,9 +35,41 @@ def load_move_cache_from_db():
     # We don't mirror to Python dict anymore; Rust owns the cache
 
 
+_save_requested = threading.Event()
+_save_thread = None
+# Held for the whole of every save: the Rust side hands each save only the entries added
+# since the previous one, so a flush must wait for a background save still writing its delta
+_save_lock = threading.Lock()
+
+
 def save_move_cache_to_db(cache_to_save=None):
-    """Save move cache from Rust engine to SQLite."""
-    _rs.save_move_cache_to_db()
+    """Save move cache from Rust engine to SQLite.
+       Blocks until a background save in progress has committed, so it is safe as the exit flush."""
+    with _save_lock:
+        _save_requested.clear()  # this save covers any pending background request
+        _rs.save_move_cache_to_db()
+
+
+def _move_cache_writer():
+    while True:
+        _save_requested.wait()
+        _save_requested.clear()
+        try:
+            with _save_lock:
+                _rs.save_move_cache_to_db()
+        except Exception as e:
+            print(f"[ERROR] Background move cache save failed: {e}")
+
+
+def save_move_cache_to_db_async():
+    """Non-blocking save for the GUI loop: wakes a background writer thread.
+       Requests made while a save is running are merged into one more save.
+       Call save_move_cache_to_db() before exit to flush."""
+    global _save_thread
+    if _save_thread is None:
+        _save_thread = threading.Thread(target=_move_cache_writer, name="MoveCacheWriter", daemon=True)
+        _save_thread.start()
+    _save_requested.set()
 
 
 # --- Sync helpers ---
@@ -67,7 +101,7 @@ def evaluate_position(gamestate):
     return _rs.evaluate_position(rs)
 
 
-def find_best_move(gamestate, depth=6, return_top_n=1, time_limit=None):
+def find_best_move(gamestate, depth=6, return_top_n=1, time_limit=None, stats=None):
     """
     Find the best move using Rust engine's iterative deepening alpha-beta search.
 
@@ -76,6 +110,8 @@ def find_best_move(gamestate, depth=6, return_top_n=1, time_limit=None):
         depth: Maximum search depth
         return_top_n: If > 1, returns list of (move, score) tuples
         time_limit: Max seconds for search. None = no limit.
+        stats: Optional dict; stats['nodes'] receives the alpha-beta node count of
+            this search (0 if it was answered without searching)
 
     Returns:
         If return_top_n == 1: best_move tuple or None
@@ -83,6 +119,8 @@ def find_best_move(gamestate, depth=6, return_top_n=1, time_limit=None):
     """
     print(f"AI ({gamestate.current_turn}) thinking with Rust engine, depth {depth}...")
     start_time = time.time()
+    if stats is not None:
+        stats['nodes'] = 0
 
     if gamestate.needs_promotion_choice:
         print("AI Error: Cannot find move, waiting for promotion choice.")
@@ -103,23 +141,28 @@ def find_best_move(gamestate, depth=6, return_top_n=1, time_limit=None):
     rs = _sync_to_rust(gamestate)
 
     # Call Rust search
-    result = _rs.find_best_move(rs, depth, return_top_n, time_limit)
+    result, nodes = _rs.find_best_move(rs, depth, return_top_n, time_limit, return_nodes=True)
+    if stats is not None:
+        stats['nodes'] = nodes
 
     elapsed = time.time() - start_time
-    print(f"AI ({gamestate.current_turn}) finished in {elapsed:.2f}s.")
+    print(f"AI ({gamestate.current_turn}) finished in {elapsed:.2f}s, {nodes} nodes.")
 
     return result
 
 
 # --- Compatibility functions used by tests and other modules ---
 
-def minimax_alpha_beta(gamestate, depth, alpha, beta, maximizing_player, allow_null=True):
+def minimax_alpha_beta(gamestate, depth, alpha, beta, maximizing_player, allow_null=True, stats=None):
     """
     Compatibility wrapper. Runs a Rust search at the given depth and returns (score, best_move).
     Note: alpha/beta/allow_null params are handled internally by Rust.
+    stats: optional dict, filled with the node count as in find_best_move.
     """
     rs = _sync_to_rust(gamestate)
-    result = _rs.find_best_move(rs, depth)
+    result, nodes = _rs.find_best_move(rs, depth, return_nodes=True)
+    if stats is not None:
+        stats['nodes'] = nodes
     if result is None:
         score = evaluate_position(gamestate)
         return (score, None)
@@ -128,22 +171,25 @@ def minimax_alpha_beta(gamestate, depth, alpha, beta, maximizing_player, allow_n
     return (0, result)
 
 
+@functools.lru_cache(maxsize=4096)
 def parse_move_string(move_str):
-    """Convert move string (e.g., 'e2e4', 'N@c3') to internal move format."""
-    try:
-        if '@' in move_str:
-            piece_char, sq_str = move_str.split('@')
-            target_sq = algebraic_to_coords(sq_str)
-            if target_sq:
-                return ('drop', piece_char, target_sq)
-        elif len(move_str) >= 4:
-            start_sq = algebraic_to_coords(move_str[:2])
-            end_sq = algebraic_to_coords(move_str[2:4])
-            promotion_char = move_str[4] if len(move_str) == 5 else None
-            if start_sq and end_sq:
-                return (start_sq, end_sq, promotion_char)
-    except Exception as e:
-        print(f"[ERROR] Failed to parse move string '{move_str}': {e}")
+    """Convert move string (e.g., 'e2e4', 'N@c3') to internal move format.
+       Memoized: the result is an immutable tuple and the same strings recur across games."""
+    # Squares are resolved via the precomputed table in utils; partition and
+    # slicing never raise, so no try/except is needed on this hot path.
+    if not isinstance(move_str, str):
+        return None
+    piece_char, at, sq_str = move_str.partition('@')
+    if at:
+        target_sq = algebraic_to_coords(sq_str)
+        if target_sq:
+            return ('drop', piece_char, target_sq)
+    elif len(move_str) >= 4:
+        start_sq = algebraic_to_coords(move_str[:2])
+        end_sq = algebraic_to_coords(move_str[2:4])
+        promotion_char = move_str[4] if len(move_str) == 5 else None
+        if start_sq and end_sq:
+            return (start_sq, end_sq, promotion_char)
     return None
 
 
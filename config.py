@@ -10,6 +10,7 @@ WIDTH = TOTAL_WIDTH + SIDE_PANEL_WIDTH  # Общая ширина окна
 HEIGHT = TOTAL_WIDTH  # Высота = доска
 FPS = 30
 AI_MOVE_DELAY = 1.5  # Задержка перед ходом ИИ (секунды) — чтобы видеть ходы
+IDLE_WAIT_MS = 100  # В простое ждем событие не дольше этого (мс) вместо тика FPS
 
 # --- Colors ---
 WHITE = (255, 255, 255)
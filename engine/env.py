@@ -1,7 +1,71 @@
 import numpy as np
 import torch
 from gamestate import GameState
-from pieces import EMPTY_SQUARE
+
+NUM_PLANES = 6 * 2 + 1
+TURN_PLANE = 12
+# Plane of each piece char, indexed by ord(): white P,N,B,R,Q,K -> 0..5, black -> 6..11, empty -> -1
+_PLANE_BY_ORD = np.full(256, -1, dtype=np.int64)
+for _i, _p in enumerate('PNBRQK'):
+    _PLANE_BY_ORD[ord(_p)] = _i
+    _PLANE_BY_ORD[ord(_p.lower())] = _i + 6
+
+
+def encode_state(state):
+    """
+    Board planes of a GameState as a float32 array (C, H, W), see MiniChessEnv._get_observation.
+    Vectorized: one byte per square from GameState.board_flat, one fancy-index store.
+    """
+    board = state.board
+    size = len(board)
+    planes = _PLANE_BY_ORD[np.frombuffer(state.board_flat, dtype=np.uint8)]
+    squares = np.flatnonzero(planes >= 0)
+    obs = np.zeros((NUM_PLANES, size * size), dtype=np.float32)
+    obs[planes[squares], squares] = 1.0
+    if state.current_turn == 'w':
+        obs[TURN_PLANE] = 1.0
+    return obs.reshape(NUM_PLANES, size, size)
+
+
+def encode_batch(states):
+    """Stacks encode_state for MCTS leaf batches: tensor (B, C, H, W)."""
+    return torch.from_numpy(np.stack([encode_state(s) for s in states]))
+
+
+def move_to_action(move, size):
+    """
+    Policy index of a move: from-square * size^2 + to-square (PolicyValueNet.action_size).
+    Drops use the from == to slot of their target square, which no board move occupies;
+    drops of different pieces (and promotion variants) share one index.
+    """
+    if move[0] == 'drop':
+        sq = move[2][0] * size + move[2][1]
+        return sq * size * size + sq
+    (r1, f1), (r2, f2) = move[0], move[1]
+    return (r1 * size + f1) * size * size + r2 * size + f2
+
+
+def make_policy_value_fn(predictor):
+    """
+    Batched policy_value_fn for MCTS: one predictor call (e.g. nn.model.DevicePredictor)
+    per leaf batch instead of one per state. The predictor's max_batch must be at least
+    MCTS.batch_size. Priors are renormalized over the legal moves of each state.
+    """
+    def policy_value_fn(states):
+        policy, value = predictor(encode_batch(states))
+        results = []
+        for state, probs, v in zip(states, policy, value):
+            moves = state.get_all_legal_moves()
+            if not moves:
+                results.append(([], float(v)))
+                continue
+            size = len(state.board)
+            p = probs[[move_to_action(m, size) for m in moves]]
+            total = p.sum()
+            p = p / total if total > 0 else np.full(len(moves), 1.0 / len(moves))
+            results.append((list(zip(moves, p.tolist())), float(v)))
+        return results
+    return policy_value_fn
 
 class MiniChessEnv:
     """
@@ -52,22 +116,5 @@ class MiniChessEnv:
         Encode board to tensor of shape (C, H, W).
         Channels: 6 piece types * 2 colors + 1 turn plane.
         """
-        board = self.state.board
-        size = len(board)
-        C = 6 * 2 + 1
-        obs = np.zeros((C, size, size), dtype=np.float32)
-        # piece plane mapping
-        piece_map = {'P': 0, 'N': 1, 'B': 2, 'R': 3, 'Q': 4, 'K': 5}
-        for r in range(size):
-            for c in range(size):
-                p = board[r][c]
-                if p == EMPTY_SQUARE:
-                    continue
-                color = 'w' if p.isupper() else 'b'
-                idx = piece_map[p.upper()]
-                plane = idx + (0 if color == 'w' else 6)
-                obs[plane, r, c] = 1.0
-        # turn plane
-        turn_plane = 12
-        obs[turn_plane, :, :] = 1.0 if self.state.current_turn == 'w' else 0.0
+        obs = encode_state(self.state)
         return torch.from_numpy(obs)
@@ -1,10 +1,68 @@
 use rusqlite::{Connection, params};
-use std::collections::HashMap;
+use std::collections::{HashMap, HashSet};
 
 const DB_PATH: &str = "move_cache.db";
 
-pub fn setup_db() -> Result<(), rusqlite::Error> {
+pub type CacheKey = (String, i32); // (position hash, depth)
+
+/// In-memory move cache. Keys inserted or changed since the last save are tracked
+/// as dirty, so a save writes only that delta instead of diffing the whole cache.
+#[derive(Default)]
+pub struct MoveCache {
+    entries: HashMap<CacheKey, String>,
+    dirty: HashSet<CacheKey>,
+}
+
+impl MoveCache {
+    pub fn get(&self, key: &CacheKey) -> Option<&String> {
+        self.entries.get(key)
+    }
+
+    pub fn contains_key(&self, key: &CacheKey) -> bool {
+        self.entries.contains_key(key)
+    }
+
+    pub fn insert(&mut self, key: CacheKey, move_repr: String) {
+        if self.entries.get(&key) != Some(&move_repr) {
+            self.dirty.insert(key.clone());
+            self.entries.insert(key, move_repr);
+        }
+    }
+
+    /// Replaces the contents with entries loaded from the DB (nothing dirty)
+    pub fn replace(&mut self, entries: HashMap<CacheKey, String>) {
+        self.entries = entries;
+        self.dirty.clear();
+    }
+
+    /// Drains the dirty keys and returns them with their current moves
+    pub fn take_dirty(&mut self) -> Vec<(CacheKey, String)> {
+        let dirty = std::mem::take(&mut self.dirty);
+        dirty.into_iter()
+            .filter_map(|key| {
+                let move_repr = self.entries.get(&key)?.clone();
+                Some((key, move_repr))
+            })
+            .collect()
+    }
+
+    /// Puts keys back after a failed save; the next save writes their current moves
+    pub fn mark_dirty(&mut self, keys: impl IntoIterator<Item = CacheKey>) {
+        self.dirty.extend(keys);
+    }
+}
+
+/// Opens the DB in WAL mode: a commit appends to the log instead of
+/// rewriting pages, and synchronous=NORMAL skips the fsync per commit.
+fn open_db() -> Result<Connection, rusqlite::Error> {
     let conn = Connection::open(DB_PATH)?;
+    conn.pragma_update_and_check(None, "journal_mode", "WAL", |row| row.get::<_, String>(0))?;
+    conn.pragma_update(None, "synchronous", "NORMAL")?;
+    Ok(conn)
+}
+
+pub fn setup_db() -> Result<(), rusqlite::Error> {
+    let conn = open_db()?;
     
     // Check if table exists and has correct schema
     let has_depth: bool = {
@@ -36,14 +94,14 @@ pub fn setup_db() -> Result<(), rusqlite::Error> {
     Ok(())
 }
 
-pub fn load_move_cache() -> HashMap<(String, i32), String> {
+pub fn load_move_cache() -> HashMap<CacheKey, String> {
     let mut cache = HashMap::new();
     if let Err(e) = setup_db() {
         eprintln!("Error setting up DB: {}", e);
         return cache;
     }
     
-    match Connection::open(DB_PATH) {
+    match open_db() {
         Ok(conn) => {
             match conn.prepare("SELECT hash, depth, best_move_repr FROM move_cache") {
                 Ok(mut stmt) => {
@@ -69,28 +127,54 @@ pub fn load_move_cache() -> HashMap<(String, i32), String> {
     cache
 }
 
-pub fn save_move_cache(cache: &HashMap<(String, i32), String>) {
-    if cache.is_empty() {
-        return;
+/// Writes the given entries (the delta from MoveCache::take_dirty) in one transaction.
+/// Returns false if nothing was committed, so the caller can mark them dirty again.
+pub fn save_move_cache(changed: &[(CacheKey, String)]) -> bool {
+    if changed.is_empty() {
+        return true;
     }
-    
-    match Connection::open(DB_PATH) {
+
+    match open_db() {
         Ok(conn) => {
-            let tx = conn.unchecked_transaction().ok();
-            let mut count = 0;
-            for ((hash, depth), move_repr) in cache {
-                if conn.execute(
+            let tx = match conn.unchecked_transaction() {
+                Ok(tx) => tx,
+                Err(e) => {
+                    eprintln!("Error saving cache: {}", e);
+                    return false;
+                }
+            };
+            let mut written = 0;
+            {
+                // One prepared statement for the whole batch
+                let mut stmt = match tx.prepare(
                     "INSERT OR REPLACE INTO move_cache (hash, depth, best_move_repr) VALUES (?1, ?2, ?3)",
-                    params![hash, depth, move_repr],
-                ).is_ok() {
-                    count += 1;
+                ) {
+                    Ok(stmt) => stmt,
+                    Err(e) => {
+                        eprintln!("Error saving cache: {}", e);
+                        return false;
+                    }
+                };
+                for (key, move_repr) in changed {
+                    if stmt.execute(params![key.0, key.1, move_repr]).is_ok() {
+                        written += 1;
+                    }
                 }
             }
-            if let Some(tx) = tx {
-                let _ = tx.commit();
+            match tx.commit() {
+                Ok(()) => {
+                    eprintln!("Saved {} entries to move cache.", written);
+                    true
+                }
+                Err(e) => {
+                    eprintln!("Error saving cache: {}", e);
+                    false
+                }
             }
-            eprintln!("Saved {} entries to move cache.", count);
         }
-        Err(e) => eprintln!("Error saving cache: {}", e),
+        Err(e) => {
+            eprintln!("Error saving cache: {}", e);
+            false
+        }
     }
 }
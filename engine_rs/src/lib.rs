@@ -9,7 +9,6 @@ use pyo3::prelude::*;
 use pyo3::types::{PyList, PyTuple, PyDict};
 use pyo3::exceptions::PyValueError;
 
-use std::collections::HashMap;
 use std::sync::Mutex;
 
 use types::*;
@@ -17,7 +16,7 @@ use gamestate::GameState as RustGameState;
 
 // Global move cache (thread-safe)
 lazy_static::lazy_static! {
-    static ref MOVE_CACHE: Mutex<HashMap<(String, i32), String>> = Mutex::new(HashMap::new());
+    static ref MOVE_CACHE: Mutex<cache::MoveCache> = Mutex::new(cache::MoveCache::default());
 }
 
 /// Convert a Python move tuple to our internal Move
@@ -515,17 +514,22 @@ impl PyGameState {
 }
 
 // Module-level AI functions
+/// With `return_nodes=True` the result is wrapped as (result, nodes): the alpha-beta node
+/// count of this very call, so concurrent searches (AI move, hint, precalc workers)
+/// never see each other's numbers.
 #[pyfunction]
-#[pyo3(signature = (gs, depth=None, return_top_n=None, time_limit=None))]
-fn find_best_move(py: Python<'_>, gs: &mut PyGameState, depth: Option<i32>, return_top_n: Option<i32>, time_limit: Option<f64>) -> PyResult<PyObject> {
+#[pyo3(signature = (gs, depth=None, return_top_n=None, time_limit=None, return_nodes=None))]
+fn find_best_move(py: Python<'_>, gs: &mut PyGameState, depth: Option<i32>, return_top_n: Option<i32>, time_limit: Option<f64>, return_nodes: Option<bool>) -> PyResult<PyObject> {
     let d = depth.unwrap_or(6);
     let top_n = return_top_n.unwrap_or(1);
     
-    let mut cache = MOVE_CACHE.lock().unwrap();
-    let (best, score) = search::find_best_move(&mut gs.inner, d, &mut cache, time_limit);
+    // Search without the GIL: the GUI loop and a concurrent hint/AI search keep running,
+    // and both share MOVE_CACHE (find_best_move locks it only for probes and inserts)
+    let inner = &mut gs.inner;
+    let (best, score, nodes) = py.allow_threads(|| search::find_best_move(inner, d, &MOVE_CACHE, time_limit));
     
-    if top_n == 1 {
-        Ok(rust_move_to_py(py, best))
+    let result: PyObject = if top_n == 1 {
+        rust_move_to_py(py, best)
     } else {
         // Return list of (move, score)
         let list = PyList::empty(py);
@@ -536,7 +540,13 @@ fn find_best_move(py: Python<'_>, gs: &mut PyGameState, depth: Option<i32>, retu
             ])?;
             list.append(tup)?;
         }
-        Ok(list.into())
+        list.into()
+    };
+    if return_nodes.unwrap_or(false) {
+        let tup = PyTuple::new(py, &[result, nodes.into_pyobject(py)?.into_any().unbind()])?;
+        Ok(tup.into())
+    } else {
+        Ok(result)
     }
 }
 
@@ -553,15 +563,20 @@ fn get_position_hash(gs: &PyGameState) -> String {
 #[pyfunction]
 fn load_move_cache_from_db() {
     let loaded = cache::load_move_cache();
-    let mut cache = MOVE_CACHE.lock().unwrap();
-    *cache = loaded;
+    MOVE_CACHE.lock().unwrap().replace(loaded);
 }
 
 #[pyfunction]
 #[pyo3(signature = (_cache_arg=None))]
-fn save_move_cache_to_db(_py: Python<'_>, _cache_arg: Option<&Bound<'_, PyAny>>) {
-    let cache = MOVE_CACHE.lock().unwrap();
-    cache::save_move_cache(&cache);
+fn save_move_cache_to_db(py: Python<'_>, _cache_arg: Option<&Bound<'_, PyAny>>) {
+    // Disk I/O without the GIL (ai saves from a background thread). Only entries added
+    // since the last save are taken, and MOVE_CACHE is not locked during the write
+    py.allow_threads(|| {
+        let delta = MOVE_CACHE.lock().unwrap().take_dirty();
+        if !cache::save_move_cache(&delta) {
+            MOVE_CACHE.lock().unwrap().mark_dirty(delta.into_iter().map(|(key, _)| key));
+        }
+    });
 }
 
 #[pyfunction]
@@ -1,18 +1,25 @@
 use std::collections::HashMap;
+use std::sync::Mutex;
 use std::time::Instant;
 
 use crate::types::*;
 use crate::gamestate::GameState;
 use crate::eval::{evaluate_position, CHECKMATE_SCORE, STALEMATE_SCORE};
 use crate::zobrist;
+use crate::cache::MoveCache;
 
 const MAX_QUIESCENCE_DEPTH: i32 = 4;
+// Per-move delta pruning in quiescence: a capture is skipped when even its material
+// swing plus this margin cannot lift stand-pat to alpha (or below beta)
+const QS_DELTA_MARGIN: i32 = 200;
+// Half-width of the aspiration window around the previous iteration's score
+const ASPIRATION_WINDOW: i32 = 50;
 // Parallel search disabled — single-threaded minimax_ab is correct and fast enough
 // (parallel had bugs: no move ordering, stale TT, missing killer/history in workers)
 const PARALLEL_DEPTH_THRESHOLD: i32 = 999;
 
 // TT entry
-#[derive(Clone)]
+#[derive(Clone, Copy)]
 pub struct TTEntry {
     pub depth: i32,
     pub score: i32,
@@ -27,40 +34,143 @@ pub enum TTFlag {
     UpperBound,
 }
 
+// History is keyed by the low 13 bits of Move::data (see the encoding in types.rs):
+// drop flag + from/to for normal moves (promotions share a slot), the whole drop.
+// 32 KB, small enough to stay in L1/L2 unlike a table over all 16 bits.
+const HISTORY_BITS: u32 = 13;
+const HISTORY_SIZE: usize = 1 << HISTORY_BITS;
+const MAX_KILLER_DEPTH: usize = 64;
+
+// 2^20 slots of (key, entry) = 24 MB, one contiguous allocation
+const TT_BITS: u32 = 20;
+const TT_EMPTY: (u64, TTEntry) = (0, TTEntry { depth: i32::MIN, score: 0, flag: TTFlag::Exact, best_move: Move::NULL });
+
+/// Fixed-size transposition table indexed by `hash & mask`: one slot per index, no
+/// hashing or probing chains. On a collision the deeper entry stays; the same position
+/// is always overwritten. The indices of occupied slots are kept, so clear() and iter()
+/// cost what the last search stored, not the whole table.
+pub struct TranspositionTable {
+    slots: Vec<(u64, TTEntry)>,
+    mask: usize,
+    used: Vec<u32>,
+}
+
+impl TranspositionTable {
+    pub fn new(bits: u32) -> Self {
+        TranspositionTable { slots: vec![TT_EMPTY; 1 << bits], mask: (1 << bits) - 1, used: Vec::new() }
+    }
+
+    #[inline]
+    pub fn get(&self, key: &u64) -> Option<&TTEntry> {
+        let (k, e) = &self.slots[*key as usize & self.mask];
+        if *k == *key && e.depth != i32::MIN { Some(e) } else { None }
+    }
+
+    #[inline]
+    pub fn insert(&mut self, key: u64, entry: TTEntry) {
+        let index = key as usize & self.mask;
+        let slot = &mut self.slots[index];
+        if slot.1.depth == i32::MIN {
+            self.used.push(index as u32);
+        }
+        if slot.0 == key || entry.depth >= slot.1.depth {
+            *slot = (key, entry);
+        }
+    }
+
+    pub fn clear(&mut self) {
+        for &index in &self.used {
+            self.slots[index as usize] = TT_EMPTY;
+        }
+        self.used.clear();
+    }
+
+    pub fn iter(&self) -> impl Iterator<Item = (&u64, &TTEntry)> {
+        self.used.iter().map(|&index| {
+            let (k, e) = &self.slots[index as usize];
+            (k, e)
+        })
+    }
+}
+
+// Finished search states, reused by the next searches instead of allocating and zeroing
+// a 24 MB table per call; it holds as many states as searches have run at the same time
+static SEARCH_STATES: Mutex<Vec<SearchState>> = Mutex::new(Vec::new());
+
 pub struct SearchState {
-    pub tt: HashMap<u64, TTEntry>,
-    pub killer_moves: HashMap<i32, [Move; 2]>,
-    pub history_scores: HashMap<u32, i32>, // move.data -> score
+    pub tt: TranspositionTable,
+    pub killer_moves: Vec<[Move; 2]>, // remaining depth -> two killer slots
+    pub history_scores: Vec<i32>,     // history_index(move) -> score
     pub deadline: Option<Instant>,
     pub stopped: bool,
-    nodes_since_check: u32,
+    pub nodes: u64,
 }
 
 impl SearchState {
     pub fn new() -> Self {
         SearchState {
-            tt: HashMap::with_capacity(1 << 20),
-            killer_moves: HashMap::new(),
-            history_scores: HashMap::new(),
+            tt: TranspositionTable::new(TT_BITS),
+            killer_moves: vec![[Move::NULL; 2]; MAX_KILLER_DEPTH],
+            history_scores: vec![0; HISTORY_SIZE],
             deadline: None,
             stopped: false,
-            nodes_since_check: 0,
+            nodes: 0,
         }
     }
 
     pub fn clear(&mut self) {
         self.tt.clear();
-        self.killer_moves.clear();
-        self.history_scores.clear();
+        self.killer_moves.fill([Move::NULL; 2]);
+        self.history_scores.fill(0);
+        self.deadline = None;
+        self.stopped = false;
+        self.nodes = 0;
+    }
+
+    /// A cleared state from the pool, or a new one if every pooled state is in use
+    pub fn acquire() -> Self {
+        match SEARCH_STATES.lock().unwrap().pop() {
+            Some(mut ss) => {
+                ss.clear();
+                ss
+            }
+            None => SearchState::new(),
+        }
+    }
+
+    /// Return a state to the pool for the next search
+    pub fn release(self) {
+        SEARCH_STATES.lock().unwrap().push(self);
+    }
+
+    #[inline]
+    fn history(&self, m: Move) -> i32 {
+        self.history_scores[history_index(m)]
+    }
+
+    #[inline]
+    fn killers(&self, depth: i32) -> [Move; 2] {
+        // Negative depth wraps to a huge usize and falls through to the default
+        self.killer_moves.get(depth as usize).copied().unwrap_or([Move::NULL; 2])
+    }
+
+    /// Beta cutoff at `depth` by `m`: bump its history score and make it the first killer
+    fn record_cutoff(&mut self, m: Move, depth: i32) {
+        self.history_scores[history_index(m)] += depth * depth;
+        if let Some(killers) = self.killer_moves.get_mut(depth as usize) {
+            if m != killers[0] {
+                killers[1] = killers[0];
+                killers[0] = m;
+            }
+        }
     }
 
-    /// Check deadline every 4096 nodes to avoid syscall overhead
+    /// Counts the node; checks the deadline every 4096 nodes to avoid syscall overhead
     #[inline]
     pub fn check_deadline(&mut self) -> bool {
         if self.stopped { return true; }
-        self.nodes_since_check += 1;
-        if self.nodes_since_check >= 4096 {
-            self.nodes_since_check = 0;
+        self.nodes += 1;
+        if self.nodes & 4095 == 0 {
             if let Some(dl) = self.deadline {
                 if Instant::now() >= dl {
                     self.stopped = true;
@@ -72,6 +182,11 @@ impl SearchState {
     }
 }
 
+#[inline]
+fn history_index(m: Move) -> usize {
+    (m.data & ((1 << HISTORY_BITS) - 1)) as usize
+}
+
 // Move ordering score
 fn mvv_lva_score(gs: &GameState, m: Move, ss: &SearchState) -> i32 {
     let mut score = 0i32;
@@ -126,7 +241,7 @@ fn mvv_lva_score(gs: &GameState, m: Move, ss: &SearchState) -> i32 {
         }
 
         // History heuristic
-        score += *ss.history_scores.get(&m.data).unwrap_or(&0);
+        score += ss.history(m);
 
     } else {
         // Drop move
@@ -179,7 +294,7 @@ fn mvv_lva_score(gs: &GameState, m: Move, ss: &SearchState) -> i32 {
             if attacks >= 2 { base += 200; }
         }
 
-        base += *ss.history_scores.get(&m.data).unwrap_or(&0);
+        base += ss.history(m);
         score = base;
     }
 
@@ -251,6 +366,9 @@ fn get_noisy_moves(gs: &mut GameState) -> Vec<Move> {
         }
     }
 
+    // Captures by MVV-LVA first; promotions and drops keep generation order after them
+    noisy.sort_by_cached_key(|&m| std::cmp::Reverse(capture_order_score(gs, m)));
+
     // Also include quiet moves that give check (limit to 12)
     let limit = check_candidates.len().min(12);
     for &m in &check_candidates[..limit] {
@@ -262,6 +380,27 @@ fn get_noisy_moves(gs: &mut GameState) -> Vec<Move> {
     noisy
 }
 
+/// Material swing of a plain capture: the victim leaves the board and lands in the
+/// captor's hand (as a pawn if it was promoted). None for anything else.
+fn capture_gain(gs: &GameState, m: Move) -> Option<i32> {
+    if m.is_drop() || m.promotion().is_some() {
+        return None;
+    }
+    let to = m.to_sq();
+    let victim = gs.board[to].piece_type()?;
+    let hand_type = if gs.promoted_pieces & (1u64 << to) != 0 { PieceType::Pawn } else { victim };
+    Some(PIECE_VALUES[victim.index()] + HAND_PIECE_VALUES[hand_type.index()])
+}
+
+fn capture_order_score(gs: &GameState, m: Move) -> i32 {
+    if m.is_drop() || gs.board[m.to_sq()].is_empty() {
+        return 0;
+    }
+    let victim = gs.board[m.to_sq()].piece_type().unwrap();
+    let aggressor = gs.board[m.from_sq()].piece_type().unwrap();
+    PIECE_VALUES[victim.index()] * 10 - PIECE_VALUES[aggressor.index()]
+}
+
 // Quiescence search
 fn quiescence_search(gs: &mut GameState, mut alpha: i32, mut beta: i32, maximizing: bool, depth: i32) -> i32 {
     let stand_pat = evaluate_position(gs);
@@ -292,8 +431,14 @@ fn quiescence_search(gs: &mut GameState, mut alpha: i32, mut beta: i32, maximizi
 
         let noisy = get_noisy_moves(gs);
         if noisy.is_empty() { return stand_pat; }
+        let in_check = gs.is_in_check(gs.current_turn);
 
         for m in &noisy {
+            if !in_check {
+                if let Some(gain) = capture_gain(gs, *m) {
+                    if stand_pat + gain + QS_DELTA_MARGIN <= alpha { continue; }
+                }
+            }
             gs.make_ai_move(*m);
             let score = quiescence_search(gs, alpha, beta, false, depth - 1);
             gs.undo_ai_move();
@@ -309,8 +454,14 @@ fn quiescence_search(gs: &mut GameState, mut alpha: i32, mut beta: i32, maximizi
 
         let noisy = get_noisy_moves(gs);
         if noisy.is_empty() { return stand_pat; }
+        let in_check = gs.is_in_check(gs.current_turn);
 
         for m in &noisy {
+            if !in_check {
+                if let Some(gain) = capture_gain(gs, *m) {
+                    if stand_pat - gain - QS_DELTA_MARGIN >= beta { continue; }
+                }
+            }
             gs.make_ai_move(*m);
             let score = quiescence_search(gs, alpha, beta, true, depth - 1);
             gs.undo_ai_move();
@@ -393,7 +544,7 @@ fn minimax_ab(
 
     // Move ordering
     let tt_best = tt_entry.as_ref().map(|e| e.best_move).unwrap_or(Move::NULL);
-    let killers = ss.killer_moves.get(&depth).cloned().unwrap_or([Move::NULL; 2]);
+    let killers = ss.killers(depth);
 
     let mut scored: Vec<(Move, i32)> = legal_moves
         .iter()
@@ -453,12 +604,8 @@ fn minimax_ab(
             alpha = alpha.max(eval_score);
             if alpha >= beta {
                 // Update killer moves & history
-                let h = ss.history_scores.entry(m.data).or_insert(0);
-                *h += depth * depth;
-                let killers = ss.killer_moves.entry(depth).or_insert([Move::NULL; 2]);
-                if m != killers[0] {
-                    killers[1] = killers[0];
-                    killers[0] = m;
+                if m.is_drop() || gs.board[m.to_sq()].is_empty() {
+                    ss.record_cutoff(m, depth);
                 }
                 break;
             }
@@ -507,12 +654,8 @@ fn minimax_ab(
             }
             beta = beta.min(eval_score);
             if beta <= alpha {
-                let h = ss.history_scores.entry(m.data).or_insert(0);
-                *h += depth * depth;
-                let killers = ss.killer_moves.entry(depth).or_insert([Move::NULL; 2]);
-                if m != killers[0] {
-                    killers[1] = killers[0];
-                    killers[0] = m;
+                if m.is_drop() || gs.board[m.to_sq()].is_empty() {
+                    ss.record_cutoff(m, depth);
                 }
                 break;
             }
@@ -541,17 +684,21 @@ fn search_worker(
     tt_snapshot: &HashMap<u64, TTEntry>,
 ) -> (Move, i32, HashMap<u64, TTEntry>) {
     let mut gs_copy = gs.fast_copy();
-    let mut ss = SearchState::new();
-    ss.tt = tt_snapshot.clone();
+    let mut ss = SearchState::acquire();
+    for (h, e) in tt_snapshot {
+        ss.tt.insert(*h, *e);
+    }
 
     gs_copy.make_ai_move(m);
     let score = minimax_recursive(&mut gs_copy, depth - 1, alpha, beta, !maximizing, true, &mut ss);
 
     // Collect valuable TT entries
     let min_depth = (depth - 3).max(1);
-    let valuable: HashMap<u64, TTEntry> = ss.tt.into_iter()
+    let valuable: HashMap<u64, TTEntry> = ss.tt.iter()
         .filter(|(_, e)| e.depth >= min_depth && !e.best_move.is_null())
+        .map(|(k, e)| (*k, *e))
         .collect();
+    ss.release();
 
     (m, score, valuable)
 }
@@ -798,39 +945,44 @@ fn minimax_parallel(
 }
 
 /// Main entry: iterative deepening + cache
+/// `move_cache` is shared by every search running at the same time (AI move and hint
+/// threads): it is locked only for a probe or an insert, never across the search itself.
+/// Returns (best move, score, alpha-beta nodes searched); quiescence nodes are not counted
+/// and cache hits report 0.
 pub fn find_best_move(
     gs: &mut GameState,
     depth: i32,
-    move_cache: &mut HashMap<(String, i32), String>,
+    move_cache: &Mutex<MoveCache>,
     time_limit: Option<f64>,
-) -> (Move, i32) {
+) -> (Move, i32, u64) {
     let start = Instant::now();
     let maximizing = gs.current_turn == Color::White;
     let pos_hash_str = gs.hash.to_string();
 
     // Check cache
     let cache_key = (pos_hash_str.clone(), depth);
-    if let Some(cached_repr) = move_cache.get(&cache_key) {
-        if let Some(m) = parse_move_repr(cached_repr) {
+    let cached = move_cache.lock().unwrap().get(&cache_key).cloned();
+    if let Some(cached_repr) = cached {
+        if let Some(m) = parse_move_repr(&cached_repr) {
             let legal = gs.get_legal_moves_vec();
             if legal.contains(&m) {
                 eprintln!("[CACHE HIT] depth {} in {:.2}s", depth, start.elapsed().as_secs_f64());
-                return (m, 0);
+                return (m, 0, 0);
             }
         }
     }
 
     let legal = gs.get_legal_moves_vec();
     if legal.is_empty() {
-        return (Move::NULL, evaluate_position(gs));
+        return (Move::NULL, evaluate_position(gs), 0);
     }
     if legal.len() == 1 {
         let m = legal[0];
-        move_cache.insert((pos_hash_str.clone(), depth), format_move_repr(m));
-        return (m, 0);
+        move_cache.lock().unwrap().insert((pos_hash_str.clone(), depth), format_move_repr(m));
+        return (m, 0, 0);
     }
 
-    let mut ss = SearchState::new();
+    let mut ss = SearchState::acquire();
     ss.deadline = time_limit.map(|secs| start + std::time::Duration::from_secs_f64(secs));
     let mut best_move = Move::NULL;
     let mut best_score = 0i32;
@@ -840,7 +992,20 @@ pub fn find_best_move(
         let iter_start = Instant::now();
 
         if current_depth < PARALLEL_DEPTH_THRESHOLD {
-            let (score, m) = minimax_ab(gs, current_depth, i32::MIN + 1, i32::MAX - 1, maximizing, true, &mut ss);
+            // Aspiration window around the previous score; full-window re-search if it fails
+            let (score, m) = if current_depth >= 3 && best_score.abs() < CHECKMATE_SCORE / 2 {
+                let asp_alpha = best_score - ASPIRATION_WINDOW;
+                let asp_beta = best_score + ASPIRATION_WINDOW;
+                let (s, mv) = minimax_ab(gs, current_depth, asp_alpha, asp_beta, maximizing, true, &mut ss);
+                if !ss.stopped && (s <= asp_alpha || s >= asp_beta) {
+                    eprintln!("  [ID] aspiration fail ({}), re-search", s);
+                    minimax_ab(gs, current_depth, i32::MIN + 1, i32::MAX - 1, maximizing, true, &mut ss)
+                } else {
+                    (s, mv)
+                }
+            } else {
+                minimax_ab(gs, current_depth, i32::MIN + 1, i32::MAX - 1, maximizing, true, &mut ss)
+            };
             // If stopped mid-search, only use result if we have a previous best
             if ss.stopped {
                 if !m.is_null() && current_depth <= 2 {
@@ -854,19 +1019,19 @@ pub fn find_best_move(
             if !m.is_null() {
                 best_move = m;
                 best_score = score;
-                move_cache.insert((pos_hash_str.clone(), current_depth), format_move_repr(m));
+                move_cache.lock().unwrap().insert((pos_hash_str.clone(), current_depth), format_move_repr(m));
             }
         } else {
             let (m, score, _) = minimax_parallel(gs, current_depth, &mut ss);
             if !m.is_null() {
                 best_move = m;
                 best_score = score;
-                move_cache.insert((pos_hash_str.clone(), current_depth), format_move_repr(m));
+                move_cache.lock().unwrap().insert((pos_hash_str.clone(), current_depth), format_move_repr(m));
             }
         }
 
         let elapsed = iter_start.elapsed().as_secs_f64();
-        eprintln!("  [ID] depth {} done in {:.2}s, score={}", current_depth, elapsed, best_score);
+        eprintln!("  [ID] depth {} done in {:.2}s, score={}, nodes={}", current_depth, elapsed, best_score, ss.nodes);
 
         if best_score.abs() >= CHECKMATE_SCORE * 9 / 10 {
             eprintln!("  Mate found at depth {}", current_depth);
@@ -883,11 +1048,12 @@ pub fn find_best_move(
 
     // Store best
     if !best_move.is_null() {
+        let mut move_cache = move_cache.lock().unwrap();
         move_cache.insert((pos_hash_str.clone(), depth), format_move_repr(best_move));
 
         // Persist TT entries to cache
         let mut tt_saved = 0;
-        for (h, e) in &ss.tt {
+        for (h, e) in ss.tt.iter() {
             if e.depth >= 4 && e.flag == TTFlag::Exact && !e.best_move.is_null() {
                 let key = (h.to_string(), e.depth);
                 if !move_cache.contains_key(&key) {
@@ -901,8 +1067,10 @@ pub fn find_best_move(
         }
     }
 
-    eprintln!("AI done in {:.2}s", start.elapsed().as_secs_f64());
-    (best_move, best_score)
+    let nodes = ss.nodes;
+    ss.release();
+    eprintln!("AI done in {:.2}s, {} nodes", start.elapsed().as_secs_f64(), nodes);
+    (best_move, best_score, nodes)
 }
 
 // Move repr formatting for cache compatibility
@@ -1,16 +1,41 @@
 # -*- coding: utf-8 -*-
-import copy
+import random
 from config import BOARD_SIZE
 from pieces import (EMPTY_SQUARE, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
                     PROMOTION_PIECES_WHITE_STR, PROMOTION_PIECES_BLACK_STR,
-                    KNIGHT_MOVES, DIAGONAL_MOVES, STRAIGHT_MOVES, KING_MOVES)
-from utils import (get_piece_color, is_on_board, get_opposite_color,
+                    KNIGHT_TARGETS, KING_TARGETS, DIAGONAL_RAYS, STRAIGHT_RAYS, QUEEN_RAYS)
+from utils import (get_piece_color, get_opposite_color, PIECE_COLOR,
                    piece_to_lower, piece_to_upper)
 
 
+# --- Zobrist Keys ---
+# Фиксированный seed: ключ позиции одинаков между запусками
+_zobrist_rng = random.Random(0x6C6B5A)
+_NUM_SQUARES = BOARD_SIZE * BOARD_SIZE
+_MAX_HAND_COUNT = 32
+ZOBRIST_PIECE = {p: [_zobrist_rng.getrandbits(64) for _ in range(_NUM_SQUARES)]
+                 for p in 'PNBRQKpnbrqk'}
+ZOBRIST_PROMOTED = [_zobrist_rng.getrandbits(64) for _ in range(_NUM_SQUARES)]
+ZOBRIST_SIDE = _zobrist_rng.getrandbits(64)  # XOR-ится, когда ход черных
+# [0] == 0: пустая рука и отсутствующий ключ в hands дают один и тот же хэш
+ZOBRIST_HAND = {(c, p): [0] + [_zobrist_rng.getrandbits(64) for _ in range(_MAX_HAND_COUNT)]
+                for c in 'wb' for p in 'PNBRQK'}
+
+
 # --- Game State Class ---
 class GameState:
     """Класс для представления состояния игры"""
+    # Фиксированный набор атрибутов: доступ через слоты быстрее, чем через __dict__
+    __slots__ = (
+        'board', 'current_turn', 'hands', 'king_pos', 'checkmate', 'stalemate',
+        'last_move', 'move_log', 'game_over_message', 'saved_states',
+        'selected_square', 'selected_drop_piece', 'highlighted_moves',
+        'needs_promotion_choice', 'promotion_square', 'last_move_for_promotion',
+        'white_ai_enabled', 'black_ai_enabled', 'ai_depth', 'show_hint',
+        '_all_legal_moves_cache', '_is_check_cache', '_hash_cache',
+        'ai_history', 'promoted_pieces', 'dirty_squares',
+    )
+
     def __init__(self):
         """Инициализация новой игры"""
         self.board = [[EMPTY_SQUARE for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
@@ -39,15 +64,18 @@ class GameState:
         self._hash_cache = None # Добавляем кэш для хэша
         self.ai_history = [] # Stack for AI undo
         self.promoted_pieces = set()  # coords (r,c) of promoted pieces (ex-pawns)
+        self.dirty_squares = set()  # coords (r,c) the GUI has to redraw (see mark_dirty)
 
 
     def save_state(self):
         """Сохраняет текущее состояние игры для возможности отмены хода"""
         state = {
-            'board': copy.deepcopy(self.board),
-            'hands': copy.deepcopy(self.hands),
+            # Доска - список строк из 1-символьных str, руки - словари int:
+            # поструктурной копии достаточно, deepcopy тут лишь тратит время
+            'board': [row[:] for row in self.board],
+            'hands': {c: h.copy() for c, h in self.hands.items()},
             'current_turn': self.current_turn,
-            'king_pos': copy.deepcopy(self.king_pos),
+            'king_pos': dict(self.king_pos),
             'checkmate': self.checkmate,
             'stalemate': self.stalemate,
             'last_move': self.last_move,
@@ -73,10 +101,10 @@ class GameState:
              return False
 
         prev_state = self.saved_states[-1]
-        self.board = copy.deepcopy(prev_state['board'])
-        self.hands = copy.deepcopy(prev_state['hands'])
+        self.board = [row[:] for row in prev_state['board']]
+        self.hands = {c: h.copy() for c, h in prev_state['hands'].items()}
         self.current_turn = prev_state['current_turn']
-        self.king_pos = copy.deepcopy(prev_state['king_pos'])
+        self.king_pos = dict(prev_state['king_pos'])
         self.checkmate = prev_state['checkmate']
         self.stalemate = prev_state['stalemate']
         self.last_move = prev_state.get('last_move') # Use get for safety
@@ -91,6 +119,8 @@ class GameState:
         self.selected_drop_piece = None
         self.highlighted_moves = []
         self._all_legal_moves_cache = None # Clear cache
+        self._hash_cache = None
+        self.mark_all_dirty()
 
         print(f"Move undone. Current turn: {self.current_turn}")
         # Remove the undone move from the log if necessary
@@ -101,48 +131,102 @@ class GameState:
 
         return True
 
+    def mark_dirty(self, *squares):
+        """Помечает клетки (r, f) для частичной перерисовки в GUI."""
+        self.dirty_squares.update(sq for sq in squares if sq is not None)
+
+    def mark_all_dirty(self):
+        """Помечает всю доску для перерисовки (новая игра, отмена хода)."""
+        self.dirty_squares.update((r, f) for r in range(BOARD_SIZE) for f in range(BOARD_SIZE))
+
+    def _mark_move_dirty(self, move):
+        """Помечает клетки хода: откуда/куда или поле сброса."""
+        if not move:
+            return
+        if move[0] == 'drop':
+            self.dirty_squares.add(move[2])
+        else:
+            self.dirty_squares.add(move[0])
+            self.dirty_squares.add(move[1])
+
+    @property
+    def board_flat(self):
+        """Доска одной строкой байтов (ord фигуры) длины BOARD_SIZE², по рядам.
+           Снимок self.board - строится заново при каждом обращении, поэтому не устаревает
+           при прямой записи в клетки (play_online, тесты)."""
+        return ''.join(map(''.join, self.board)).encode('ascii')
+
+    @property
+    def zobrist_key(self):
+        """Zobrist-ключ позиции (доска, руки, превращенные фигуры, очередь хода).
+           Считается целиком при первом обращении, дальше make_ai_move/undo_ai_move
+           обновляют его XOR-ами, пока он есть. Ходы GUI сбрасывают кэш (_hash_cache),
+           и ключ остается ленивым до следующего обращения."""
+        if self._hash_cache is None:
+            self._hash_cache = self._compute_zobrist_key()
+        return self._hash_cache
+
+    def _compute_zobrist_key(self):
+        """Полный пересчет Zobrist-ключа с нуля."""
+        key = ZOBRIST_SIDE if self.current_turn == 'b' else 0
+        for r, row in enumerate(self.board):
+            base = r * BOARD_SIZE
+            for f, piece in enumerate(row):
+                if piece != EMPTY_SQUARE:
+                    key ^= ZOBRIST_PIECE[piece][base + f]
+        for r, f in self.promoted_pieces:
+            key ^= ZOBRIST_PROMOTED[r * BOARD_SIZE + f]
+        for color in ('w', 'b'):
+            for piece_type, count in self.hands[color].items():
+                key ^= ZOBRIST_HAND[color, piece_type][count]
+        return key
+
     def reset_board(self):
         """Сбрасывает состояние игры к начальному, вызывая __init__."""
         self.__init__()
 
     def copy(self):
-        """Создает и возвращает глубокую копию текущего объекта GameState."""
-        try:
-            hands_copy = copy.deepcopy(self.hands)
-            board_copy = copy.deepcopy(self.board)
-            king_pos_copy = copy.deepcopy(self.king_pos)
-        except Exception as e:
-            print(f"[ERROR GameState.copy] Deepcopy failed: {e}")
-            hands_copy = {'w':{}, 'b':{}}
-            board_copy = [[EMPTY_SQUARE for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
-            king_pos_copy = {'w': None, 'b': None}
-
-        # Теперь создаем новый объект
-        new_state = GameState()
+        """Создает и возвращает полную копию текущего объекта GameState (с выделением
+           и подсветкой ходов). Позиция копируется через fast_clone, без deepcopy."""
+        new_state = self.fast_clone()
+        new_state.move_log = []
+        new_state.show_hint = False
+        new_state.selected_square = self.selected_square
+        new_state.selected_drop_piece = self.selected_drop_piece
+        new_state.highlighted_moves = self.highlighted_moves[:]  # ходы - неизменяемые кортежи
+        return new_state
 
-        # Присваиваем скопированные значения
-        new_state.board = board_copy
+    def fast_clone(self):
+        """Копия для фоновых потоков AI: без __init__ и deepcopy. Изменяемые части позиции
+           (board, hands, king_pos, promoted_pieces) копируются, история отмены (saved_states)
+           и UI-состояние не переносятся."""
+        new_state = object.__new__(GameState)
+        new_state.board = [row[:] for row in self.board]
         new_state.current_turn = self.current_turn
-        new_state.hands = hands_copy # Используем УЖЕ скопированное значение
-        new_state.king_pos = king_pos_copy
-
-        # Копируем остальные атрибуты (как раньше)
+        new_state.hands = {color: hand.copy() for color, hand in self.hands.items()}
+        new_state.king_pos = self.king_pos.copy()
         new_state.checkmate = self.checkmate
         new_state.stalemate = self.stalemate
         new_state.last_move = self.last_move
+        new_state.move_log = self.move_log[:]
         new_state.game_over_message = self.game_over_message
-        new_state.selected_square = self.selected_square
-        new_state.selected_drop_piece = self.selected_drop_piece
-        new_state.highlighted_moves = copy.deepcopy(self.highlighted_moves)
+        new_state.saved_states = []
+        new_state.selected_square = None
+        new_state.selected_drop_piece = None
+        new_state.highlighted_moves = []
         new_state.needs_promotion_choice = self.needs_promotion_choice
         new_state.promotion_square = self.promotion_square
         new_state.last_move_for_promotion = self.last_move_for_promotion
         new_state.white_ai_enabled = self.white_ai_enabled
         new_state.black_ai_enabled = self.black_ai_enabled
         new_state.ai_depth = self.ai_depth
-        new_state.promoted_pieces = set(self.promoted_pieces)
+        new_state.show_hint = self.show_hint
         new_state._all_legal_moves_cache = None
-
+        new_state._is_check_cache = None
+        new_state._hash_cache = self._hash_cache
+        new_state.ai_history = []
+        new_state.promoted_pieces = set(self.promoted_pieces)
+        new_state.dirty_squares = set()
         return new_state
 
     def fast_copy_for_simulation(self):
@@ -168,6 +252,7 @@ class GameState:
         new_state.needs_promotion_choice = self.needs_promotion_choice
         new_state.promotion_square = self.promotion_square
         new_state.promoted_pieces = set(self.promoted_pieces)
+        new_state._hash_cache = self._hash_cache  # позиция та же - ключ тоже
         
         # НЕ копируем: saved_states, move_log, UI элементы, кеши
         # Это делает копирование в ~10-20 раз быстрее
@@ -216,17 +301,27 @@ class GameState:
         self.promotion_square = None
         self.last_move_for_promotion = None
         self._all_legal_moves_cache = None
+        self._hash_cache = None
+        self.mark_all_dirty()
         self.save_state() # Save the initial state
 
 
     def make_move(self, move, is_check_game_over=True):
         """Выполняет ход, меняет текущего игрока и проверяет окончание игры."""
         self._all_legal_moves_cache = None # Invalidate cache
+        self._hash_cache = None
 
         if self.needs_promotion_choice:
             print("Error: Cannot make move, must choose promotion first.")
             return False
 
+        # Клетки, чей вид изменится: прошлый и новый ход, выделение, подсветка, короли (шах)
+        self._mark_move_dirty(self.last_move)
+        self._mark_move_dirty(move)
+        self.mark_dirty(self.selected_square, *self.king_pos.values())
+        for highlighted in self.highlighted_moves:
+            self._mark_move_dirty(highlighted)
+
         # --- Handle Drop Move ---
         if move[0] == 'drop':
             _, piece_code, (r, f) = move # piece_code is 'wN', 'bP', etc.
@@ -389,6 +484,7 @@ class GameState:
         # Update board
         self.board[r][f] = chosen_piece_char
         self.promoted_pieces.add((r, f))  # track as promoted
+        self.mark_dirty((r, f), *self.king_pos.values())
 
         # Update the last move in the log
         if self.move_log and self.last_move_for_promotion:
@@ -430,6 +526,7 @@ class GameState:
         self.selected_drop_piece = None
         self.highlighted_moves = []
         self._all_legal_moves_cache = None # Invalidate cache
+        self._hash_cache = None
 
         print(f"Promotion to {chosen_piece_char} completed. Turn: {self.current_turn}")
 
@@ -449,7 +546,7 @@ class GameState:
 
         # Forward move
         nr, nf = r + direction, f
-        if is_on_board(nr, nf) and self.board[nr][nf] == EMPTY_SQUARE:
+        if 0 <= nr < BOARD_SIZE and self.board[nr][nf] == EMPTY_SQUARE:
             if nr == promotion_rank:
                 # Generate promotion moves immediately
                 for prom_piece in prom_pieces:
@@ -460,9 +557,9 @@ class GameState:
         # Captures
         for df in [-1, 1]:
             nr, nf = r + direction, f + df
-            if is_on_board(nr, nf):
+            if 0 <= nr < BOARD_SIZE and 0 <= nf < BOARD_SIZE:
                 target_piece = self.board[nr][nf]
-                if target_piece != EMPTY_SQUARE and get_piece_color(target_piece) != color:
+                if target_piece != EMPTY_SQUARE and PIECE_COLOR[target_piece] != color:
                     if nr == promotion_rank:
                         for prom_piece in prom_pieces:
                             moves.append(((r, f), (nr, nf), prom_piece))
@@ -472,48 +569,46 @@ class GameState:
 
     def get_knight_moves(self, r, f, color):
         moves = []
-        for dr, df in KNIGHT_MOVES:
-            nr, nf = r + dr, f + df
-            if is_on_board(nr, nf):
-                target_piece = self.board[nr][nf]
-                if target_piece == EMPTY_SQUARE or get_piece_color(target_piece) != color:
-                    moves.append(((r, f), (nr, nf), None))
+        board = self.board
+        for nr, nf in KNIGHT_TARGETS[r][f]:
+            target_piece = board[nr][nf]
+            if target_piece == EMPTY_SQUARE or PIECE_COLOR[target_piece] != color:
+                moves.append(((r, f), (nr, nf), None))
         return moves
 
-    def get_sliding_moves(self, r, f, color, directions):
+    def get_sliding_moves(self, r, f, color, rays):
+        """rays - лучи из клетки (r, f), см. DIAGONAL_RAYS / STRAIGHT_RAYS в pieces.py"""
         moves = []
-        for dr, df in directions:
-            nr, nf = r + dr, f + df
-            while is_on_board(nr, nf):
-                target_piece = self.board[nr][nf]
+        board = self.board
+        for ray in rays:
+            for nr, nf in ray:
+                target_piece = board[nr][nf]
                 if target_piece == EMPTY_SQUARE:
                     moves.append(((r, f), (nr, nf), None))
-                elif get_piece_color(target_piece) != color:
+                elif PIECE_COLOR[target_piece] != color:
                     moves.append(((r, f), (nr, nf), None)) # Capture
                     break
                 else: # Friendly piece
                     break
-                nr, nf = nr + dr, nf + df
         return moves
 
     def get_bishop_moves(self, r, f, color):
-        return self.get_sliding_moves(r, f, color, DIAGONAL_MOVES)
+        return self.get_sliding_moves(r, f, color, DIAGONAL_RAYS[r][f])
 
     def get_rook_moves(self, r, f, color):
-         return self.get_sliding_moves(r, f, color, STRAIGHT_MOVES)
+         return self.get_sliding_moves(r, f, color, STRAIGHT_RAYS[r][f])
 
     def get_queen_moves(self, r, f, color): # Queens can only appear via drops currently
-        return self.get_sliding_moves(r, f, color, DIAGONAL_MOVES + STRAIGHT_MOVES)
+        return self.get_sliding_moves(r, f, color, QUEEN_RAYS[r][f])
 
     def get_king_moves(self, r, f, color):
         moves = []
+        board = self.board
         # King cannot move into check - this check is done in get_all_legal_moves
-        for dr, df in KING_MOVES:
-            nr, nf = r + dr, f + df
-            if is_on_board(nr, nf):
-                target_piece = self.board[nr][nf]
-                if target_piece == EMPTY_SQUARE or get_piece_color(target_piece) != color:
-                     moves.append(((r, f), (nr, nf), None))
+        for nr, nf in KING_TARGETS[r][f]:
+            target_piece = board[nr][nf]
+            if target_piece == EMPTY_SQUARE or PIECE_COLOR[target_piece] != color:
+                 moves.append(((r, f), (nr, nf), None))
         # Castling is not part of mini crazyhouse
         return moves
 
@@ -531,7 +626,7 @@ class GameState:
         for r in range(BOARD_SIZE):
             for f in range(BOARD_SIZE):
                 piece = self.board[r][f] # Используем self.board
-                piece_color = get_piece_color(piece) # Может вернуть None для EMPTY_SQUARE
+                piece_color = PIECE_COLOR[piece] # None для EMPTY_SQUARE
 
 
                 # if r == 5 and f == 4: # Пример для вывода конкретной клетки (где стоит wK в одном из логов)
@@ -651,7 +746,7 @@ class GameState:
         """Проверяет, атаковано ли поле (r, f) фигурами цвета attacker_color.
            Использует self.board.
         """
-        opponent_color = get_opposite_color(attacker_color)
+        board = self.board # Локальная ссылка: LOAD_FAST вместо LOAD_ATTR в циклах
 
         # Check Pawns
         pawn_piece = PAWN[0] if attacker_color == 'w' else PAWN[1]
@@ -659,14 +754,13 @@ class GameState:
         # Pawns attack diagonally forward relative to their movement direction
         for df_attack in [-1, 1]:
             pr, pf = r - pawn_dir, f + df_attack # Check squares where attacker pawn could be
-            if is_on_board(pr, pf) and self.board[pr][pf] == pawn_piece:
+            if 0 <= pr < BOARD_SIZE and 0 <= pf < BOARD_SIZE and board[pr][pf] == pawn_piece:
                  return True
 
         # Check Knights
         knight_piece = KNIGHT[0] if attacker_color == 'w' else KNIGHT[1]
-        for dr, df in KNIGHT_MOVES:
-            nr, nf = r + dr, f + df
-            if is_on_board(nr, nf) and self.board[nr][nf] == knight_piece:
+        for nr, nf in KNIGHT_TARGETS[r][f]:
+            if board[nr][nf] == knight_piece:
                  return True
 
         # Check Sliding Pieces (Bishops, Rooks, Queens)
@@ -675,32 +769,27 @@ class GameState:
         queen_piece = QUEEN[0] if attacker_color == 'w' else QUEEN[1] # Queens can be dropped
 
         # Diagonal Attacks (Bishop, Queen)
-        for dr, df in DIAGONAL_MOVES:
-            cr, cf = r + dr, f + df
-            while is_on_board(cr, cf):
-                piece = self.board[cr][cf]
+        for ray in DIAGONAL_RAYS[r][f]:
+            for cr, cf in ray:
+                piece = board[cr][cf]
                 if piece != EMPTY_SQUARE:
                     if piece == bishop_piece or piece == queen_piece:
                          return True
                     break # Path blocked
-                cr, cf = cr + dr, cf + df
 
         # Straight Attacks (Rook, Queen)
-        for dr, df in STRAIGHT_MOVES:
-            cr, cf = r + dr, f + df
-            while is_on_board(cr, cf):
-                piece = self.board[cr][cf]
+        for ray in STRAIGHT_RAYS[r][f]:
+            for cr, cf in ray:
+                piece = board[cr][cf]
                 if piece != EMPTY_SQUARE:
                     if piece == rook_piece or piece == queen_piece:
                          return True
                     break # Path blocked
-                cr, cf = cr + dr, cf + df
 
         # Check King
         king_piece = KING[0] if attacker_color == 'w' else KING[1]
-        for dr, df in KING_MOVES:
-            kr, kf = r + dr, f + df
-            if is_on_board(kr, kf) and self.board[kr][kf] == king_piece:
+        for kr, kf in KING_TARGETS[r][f]:
+            if board[kr][kf] == king_piece:
                  return True
 
         return False
@@ -721,8 +810,14 @@ class GameState:
             'prev_checkmate': self.checkmate,
             'prev_stalemate': self.stalemate,
             'prev_last_move': self.last_move,
-            # 'prev_hash': self._hash_cache # If we use incremental hash
+            'prev_hash': self._hash_cache,
         }
+        # Ключ ведется XOR-ами, только если он уже посчитан: иначе пробные ходы проверки
+        # легальности после хода GUI платили бы за полный пересчет и за учет XOR-ов
+        key = self._hash_cache
+        hashing = key is not None
+        if hashing:
+            key ^= ZOBRIST_SIDE
         
         # 2. Apply move
         if move[0] == 'drop':
@@ -732,7 +827,11 @@ class GameState:
             piece_type_upper = piece_code[1]
             
             self.board[r][f] = piece_char
-            self.hands[color][piece_type_upper] -= 1
+            count = self.hands[color][piece_type_upper]
+            if hashing:
+                hand_keys = ZOBRIST_HAND[color, piece_type_upper]
+                key ^= ZOBRIST_PIECE[piece_char][r * BOARD_SIZE + f] ^ hand_keys[count] ^ hand_keys[count - 1]
+            self.hands[color][piece_type_upper] = count - 1
             
             self.last_move = move
             self.current_turn = get_opposite_color(self.current_turn)
@@ -742,23 +841,36 @@ class GameState:
             piece = self.board[r1][f1]
             target = self.board[r2][f2]
             color = get_piece_color(piece)
+            if hashing:
+                sq1 = r1 * BOARD_SIZE + f1
+                sq2 = r2 * BOARD_SIZE + f2
             
             # Handle capture
             if target != EMPTY_SQUARE:
                 undo_info['captured'] = target
                 captured_type = target.upper()
+                if hashing:
+                    key ^= ZOBRIST_PIECE[target][sq2]
                 # Crazyhouse: promoted piece reverts to pawn when captured
                 if (r2, f2) in self.promoted_pieces:
                     captured_type = 'P'
                     self.promoted_pieces.discard((r2, f2))
                     undo_info['was_promoted'] = True
-                self.hands[color][captured_type] = self.hands[color].get(captured_type, 0) + 1
+                    if hashing:
+                        key ^= ZOBRIST_PROMOTED[sq2]
+                count = self.hands[color].get(captured_type, 0)
+                if hashing:
+                    hand_keys = ZOBRIST_HAND[color, captured_type]
+                    key ^= hand_keys[count] ^ hand_keys[count + 1]
+                self.hands[color][captured_type] = count + 1
             
             # Track movement of promoted pieces
             if (r1, f1) in self.promoted_pieces:
                 self.promoted_pieces.discard((r1, f1))
                 self.promoted_pieces.add((r2, f2))
                 undo_info['moved_promoted'] = True
+                if hashing:
+                    key ^= ZOBRIST_PROMOTED[sq1] ^ ZOBRIST_PROMOTED[sq2]
 
             # Update board
             self.board[r1][f1] = EMPTY_SQUARE
@@ -766,8 +878,12 @@ class GameState:
                 self.board[r2][f2] = promotion
                 self.promoted_pieces.add((r2, f2))  # new promotion
                 undo_info['new_promotion'] = True
+                if hashing:
+                    key ^= ZOBRIST_PROMOTED[sq2]
             else:
                 self.board[r2][f2] = piece
+            if hashing:
+                key ^= ZOBRIST_PIECE[piece][sq1] ^ ZOBRIST_PIECE[self.board[r2][f2]][sq2]
                 
             # Update King pos
             if piece.upper() == 'K':
@@ -782,7 +898,7 @@ class GameState:
         
         # 4. Invalidate caches
         self._all_legal_moves_cache = None
-        self._hash_cache = None
+        self._hash_cache = key
         self._is_check_cache = None
         
         return True
@@ -854,6 +970,6 @@ class GameState:
         self.last_move = undo_info['prev_last_move']
         
         self._all_legal_moves_cache = None
-        self._hash_cache = None
+        self._hash_cache = undo_info['prev_hash']
         self._is_check_cache = None
         return True
\ No newline at end of file
@@ -3,6 +3,11 @@ import pygame
 import sys
 import os
 import math
+import functools
+try:
+    import numpy as np
+except ImportError:
+    np = None  # pygame.surfarray needs NumPy; invert_surface_colors falls back to blits
 from config import *
 from pieces import (PIECE_BG_COLORS, PIECES_ALL_CASES, EMPTY_SQUARE,
                     PROMOTION_PIECES_WHITE_STR, PROMOTION_PIECES_BLACK_STR, PIECE_TO_SYMBOL)
@@ -11,30 +16,68 @@ from utils import get_piece_color, piece_to_lower, piece_to_upper, coords_to_alg
 
 # Global dictionary for piece images
 PIECE_IMAGES = {}
-
-# Initialize Pygame here for font loading
-pygame.init()
-FONT_COORD = pygame.font.SysFont('consolas', 13, bold=True)
-FONT_INFO = pygame.font.SysFont('segoeui', 17)
-FONT_HAND = pygame.font.SysFont('segoeui', 20)
-FONT_BUTTON = pygame.font.SysFont('segoeui', 15, bold=True)
-FONT_PROMOTION = pygame.font.SysFont('segoeui', 20, bold=True)
-FONT_PIECE = pygame.font.SysFont('segoeui', 48, bold=True)
-FONT_TITLE = pygame.font.SysFont('segoeui', 22, bold=True)
-FONT_STATUS = pygame.font.SysFont('segoeui', 16, bold=True)
+# Same images indexed by ord(piece_char); empty squares map to None
+_PIECE_IMG_BY_ORD = [None] * 256
+# Hand (side panel) thumbnails, pre-scaled once in load_images
+PIECE_IMAGES_HAND = {}
+HAND_PIECE_SIZE = 32
+HAND_PIECE_PAD = 4
+# (color, hand piece type) -> board char of that color, e.g. ('b', 'N') -> 'n'
+_HAND_CHAR = {(color, t): (t.upper() if color == 'w' else t.lower())
+              for color in ('w', 'b') for t in 'PNBRQKpnbrqk'}
+SMOOTHSCALE_MIN_SIZE = 64  # Below this size pygame.transform.scale is used instead of smoothscale
+
+# Fonts are created by init_gui(): SysFont scans system font files, which is
+# wasted work when gui is imported without a window (tests, AI self-play)
+FONT_COORD = FONT_INFO = FONT_HAND = FONT_BUTTON = None
+FONT_PROMOTION = FONT_PIECE = FONT_TITLE = FONT_STATUS = None
+_FONTS = {}
+
+def init_gui():
+    """Initializes pygame and the UI fonts. Call once from main before drawing."""
+    global FONT_COORD, FONT_INFO, FONT_HAND, FONT_BUTTON
+    global FONT_PROMOTION, FONT_PIECE, FONT_TITLE, FONT_STATUS, _TURN_RECT
+    pygame.init()
+    FONT_COORD = pygame.font.SysFont('consolas', 13, bold=True)
+    FONT_INFO = pygame.font.SysFont('segoeui', 17)
+    FONT_HAND = pygame.font.SysFont('segoeui', 20)
+    FONT_BUTTON = pygame.font.SysFont('segoeui', 15, bold=True)
+    FONT_PROMOTION = pygame.font.SysFont('segoeui', 20, bold=True)
+    FONT_PIECE = pygame.font.SysFont('segoeui', 48, bold=True)
+    FONT_TITLE = pygame.font.SysFont('segoeui', 22, bold=True)
+    FONT_STATUS = pygame.font.SysFont('segoeui', 16, bold=True)
+    _FONTS.update({
+        'coord': FONT_COORD, 'info': FONT_INFO, 'hand': FONT_HAND, 'button': FONT_BUTTON,
+        'promotion': FONT_PROMOTION, 'piece': FONT_PIECE, 'title': FONT_TITLE, 'status': FONT_STATUS,
+    })
+    _render.cache_clear()
+    # Same layout as the top of draw_side_panel: 14px margin, title, 12px gap
+    title_h = FONT_TITLE.size("Mini Crazyhouse 6×6")[1]
+    _TURN_RECT = pygame.Rect(TOTAL_WIDTH + 14, 14 + title_h + 12, SIDE_PANEL_WIDTH - 28, 30)
+
+@functools.lru_cache(maxsize=512)
+def _render(font_key, text, color):
+    """Renders antialiased text with one of the module fonts. Cached: almost every
+       UI string (labels, buttons, turn/status lines) repeats frame after frame."""
+    assert FONT_INFO is not None, "init_gui() must be called before drawing"
+    return _FONTS[font_key].render(text, True, color).convert_alpha()
 
 # --- Image Loading and Helper Functions ---
 
+# Top-left pixel of every square, indexed [board_flipped][row][col]
+_SCREEN_XY = [
+    [[(f * SQUARE_SIZE, r * SQUARE_SIZE) for f in range(BOARD_SIZE)] for r in range(BOARD_SIZE)],
+    [[((BOARD_SIZE - 1 - f) * SQUARE_SIZE, (BOARD_SIZE - 1 - r) * SQUARE_SIZE) for f in range(BOARD_SIZE)]
+     for r in range(BOARD_SIZE)],
+]
+
+# Same coordinates indexed [board_flipped][r * BOARD_SIZE + f], matching GameState.board_flat
+_SCREEN_XY_FLAT = [[xy for row in rows for xy in row] for rows in _SCREEN_XY]
+
 def get_screen_coords(logical_coords, board_flipped):
     """Преобразует логические координаты (row, col) в экранные пиксельные координаты (x, y) левого верхнего угла клетки, учитывая переворот доски."""
     r, f = logical_coords
-    if board_flipped:
-        screen_row = BOARD_SIZE - 1 - r
-        screen_col = BOARD_SIZE - 1 - f
-    else:
-        screen_row = r
-        screen_col = f
-    return screen_col * SQUARE_SIZE, screen_row * SQUARE_SIZE
+    return _SCREEN_XY[board_flipped][r][f]
 
 def resize_image(surface, target_size):
     """Resizes a Pygame surface while maintaining aspect ratio and centering."""
@@ -58,10 +101,10 @@ def resize_image(surface, target_size):
     new_width = max(1, new_width)
     new_height = max(1, new_height)
 
-    try:
+    # Filtering is only visible on board-sized pieces; small thumbnails use the cheaper scale
+    if target_size >= SMOOTHSCALE_MIN_SIZE:
         scaled_surface = pygame.transform.smoothscale(surface, (new_width, new_height))
-    except ValueError:
-        # Fallback if smoothscale fails (e.g., surface too small)
+    else:
         scaled_surface = pygame.transform.scale(surface, (new_width, new_height))
 
     # Center the scaled image onto a target-sized transparent surface
@@ -75,43 +118,63 @@ def invert_surface_colors(surface):
     """Creates a new surface, mapping dark pixels to light gray, preserving alpha."""
     # Ensure the input surface has per-pixel alpha for transparency handling
     src_surface = surface.convert_alpha()
-    width, height = src_surface.get_size()
-    inverted_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+    inverted_surface = pygame.Surface(src_surface.get_size(), pygame.SRCALPHA)
 
     TARGET_GRAY = (200, 200, 200) # Target color for the main body of white pieces
     EDGE_GRAY = (150, 150, 150)   # Target color for anti-aliased edges
     DARK_THRESHOLD = 150          # Pixels darker than this (sum of RGB) are considered part of the piece
     ALPHA_THRESHOLD = 128         # Pixels less transparent than this are considered
 
+    if np is None:
+        return _invert_surface_colors_blend(src_surface, TARGET_GRAY)
+
+    # Whole-plane NumPy masks instead of a get_at/set_at loop per pixel.
+    # surfarray views lock the surfaces while they are alive.
     try:
-        src_surface.lock()
-        inverted_surface.lock()
-        for x in range(width):
-            for y in range(height):
-                r, g, b, a = src_surface.get_at((x, y))
-
-                if a >= ALPHA_THRESHOLD: # Consider only sufficiently opaque pixels
-                    brightness = r + g + b
-                    if brightness < DARK_THRESHOLD:
-                        # Dark pixel -> map to target light gray
-                        inverted_surface.set_at((x, y), (*TARGET_GRAY, a))
-                    else:
-                        # Lighter pixel (likely anti-aliasing) -> map to edge gray
-                        # Or you could try other mappings, e.g., scaling the original gray
-                        inverted_surface.set_at((x, y), (*EDGE_GRAY, a))
-                # else: pixel is mostly transparent, leave it transparent in inverted_surface
-
-    finally:
-        src_surface.unlock()
-        inverted_surface.unlock()
+        src_rgb = pygame.surfarray.pixels3d(src_surface)
+        src_alpha = pygame.surfarray.pixels_alpha(src_surface)
+    except ValueError:
+        # Pixel format surfarray can't reference directly (e.g. unusual display depth)
+        return _invert_surface_colors_blend(src_surface, TARGET_GRAY)
+    opaque = src_alpha >= ALPHA_THRESHOLD # Consider only sufficiently opaque pixels
+    brightness = src_rgb.astype(np.uint16).sum(axis=-1)
+    dark = opaque & (brightness < DARK_THRESHOLD) # Dark pixel -> target light gray
+    edge = opaque & ~dark                         # Lighter pixel (likely anti-aliasing) -> edge gray
+    out_alpha = np.where(opaque, src_alpha, 0)    # Mostly transparent pixels stay transparent
+    del src_rgb, src_alpha
+
+    dst_rgb = pygame.surfarray.pixels3d(inverted_surface)
+    dst_rgb[dark] = TARGET_GRAY
+    dst_rgb[edge] = EDGE_GRAY
+    del dst_rgb
+    pygame.surfarray.pixels_alpha(inverted_surface)[...] = out_alpha
+    return inverted_surface
+
+def _invert_surface_colors_blend(src_surface, target_gray):
+    """Blit-only variant of invert_surface_colors, used when NumPy is unavailable
+       or surfarray can't reference the surface's pixels.
+       Dark strokes are subtracted from a light-gray fill (dark -> light), then the
+       source alpha is copied over with an RGBA_MIN blit. No per-pixel thresholds."""
+    inverted_surface = pygame.Surface(src_surface.get_size(), pygame.SRCALPHA)
+    inverted_surface.fill((*target_gray, 255))
+    inverted_surface.blit(src_surface, (0, 0), special_flags=pygame.BLEND_RGB_SUB)
+    # Opaque white copy of the source that keeps only its alpha channel
+    alpha_mask = src_surface.copy()
+    alpha_mask.fill((255, 255, 255, 0), special_flags=pygame.BLEND_RGBA_MAX)
+    inverted_surface.blit(alpha_mask, (0, 0), special_flags=pygame.BLEND_RGBA_MIN)
     return inverted_surface
 
 def load_images(image_dir="assets/sprites", target_piece_size=int(SQUARE_SIZE * 0.9)):
     """Loads piece images from a directory, resizes, creates white versions by inverting.
        Uses specific filenames provided by user.
+       Must be called after pygame.display.set_mode(): all stored surfaces (pieces,
+       hand thumbnails, overlays) are converted to the display's pixel format.
     """
     print(f"Loading piece images from '{image_dir}'...")
     PIECE_IMAGES.clear()
+    PIECE_IMAGES_HAND.clear()
+    _PIECE_IMG_BY_ORD[:] = [None] * 256
+    _hand_strip.cache_clear()
     found_files = 0
 
     # Map internal piece type to user filenames and characters
@@ -146,12 +209,12 @@ def load_images(image_dir="assets/sprites", target_piece_size=int(SQUARE_SIZE *
 
                 # Resize black piece image
                 resized_black_image = resize_image(original_image, SQUARE_SIZE)
-                PIECE_IMAGES[black_piece_char] = resized_black_image
+                PIECE_IMAGES[black_piece_char] = resized_black_image.convert_alpha()
                 print(f"    -> Stored as '{black_piece_char}'")
 
                 # Create and store white piece image by converting colors
                 converted_white_image = invert_surface_colors(resized_black_image)
-                PIECE_IMAGES[white_piece_char] = converted_white_image
+                PIECE_IMAGES[white_piece_char] = converted_white_image.convert_alpha()
                 print(f"    -> Converted and stored as '{white_piece_char}'")
                 found_files += 1
 
@@ -160,27 +223,38 @@ def load_images(image_dir="assets/sprites", target_piece_size=int(SQUARE_SIZE *
         else:
             print(f"!! Warning: Image file not found: {filepath}")
 
-    if found_files > 0:
-        print(f"Successfully loaded and processed {found_files * 2} piece images.")
-        return True
-    else:
-        print("!! Error: No piece image files found or processed. Ensure they are in the correct directory and format.")
+    missing = [piece_char for piece_char in PIECES_ALL_CASES if piece_char not in PIECE_IMAGES]
+    if missing:
+        print(f"!! Error: Missing piece images for {missing}. Ensure they are in the correct directory and format.")
         return False
 
+    _build_overlays()
+    for piece_char, image in PIECE_IMAGES.items():
+        _PIECE_IMG_BY_ORD[ord(piece_char)] = image
+        PIECE_IMAGES_HAND[piece_char] = pygame.transform.scale(
+            image, (HAND_PIECE_SIZE, HAND_PIECE_SIZE)).convert_alpha()
+
+    print(f"Successfully loaded and processed {found_files * 2} piece images.")
+    return True
+
 # --- Primitive Drawing Functions (OBSOLETE - Keep for reference?) ---
 # Remove imports from pieces.py for draw_ functions
 # from pieces import draw_pawn, draw_knight, draw_bishop, draw_rook, draw_king
 
 # --- Drawing Functions ---
 
-def draw_board(screen, board_flipped):
-    """Draws the checkerboard pattern with subtle coordinate labels."""
+# Pre-rendered board backgrounds (squares + coordinates), keyed by board_flipped
+_BOARD_BG = {}
+
+def _render_board_background(board_flipped):
+    """Renders the checkerboard pattern with subtle coordinate labels onto a new surface."""
+    surface = pygame.Surface((TOTAL_WIDTH, HEIGHT)).convert()
     for r in range(BOARD_SIZE):
         for f in range(BOARD_SIZE):
             is_light = (r + f) % 2 == 0
             color = BOARD_COLORS['light'] if is_light else BOARD_COLORS['dark']
             x, y = get_screen_coords((r, f), board_flipped)
-            pygame.draw.rect(screen, color, pygame.Rect(x, y, SQUARE_SIZE, SQUARE_SIZE))
+            pygame.draw.rect(surface, color, pygame.Rect(x, y, SQUARE_SIZE, SQUARE_SIZE))
 
     # Draw coordinates on edges only
     for i in range(BOARD_SIZE):
@@ -191,8 +265,8 @@ def draw_board(screen, board_flipped):
         rank_label = str(BOARD_SIZE - r) if not board_flipped else str(r + 1)
         is_light = (r + f) % 2 == 0
         label_color = BOARD_COLORS['dark'] if is_light else BOARD_COLORS['light']
-        coord_text = FONT_COORD.render(rank_label, True, label_color)
-        screen.blit(coord_text, (x + 3, y + 3))
+        coord_text = _render('coord', rank_label, label_color)
+        surface.blit(coord_text, (x + 3, y + 3))
 
         # File labels (bottom edge)
         r = BOARD_SIZE - 1
@@ -201,82 +275,88 @@ def draw_board(screen, board_flipped):
         file_label = chr(ord('a') + f) if not board_flipped else chr(ord('a') + BOARD_SIZE - 1 - f)
         is_light = (r + f) % 2 == 0
         label_color = BOARD_COLORS['dark'] if is_light else BOARD_COLORS['light']
-        coord_text = FONT_COORD.render(file_label, True, label_color)
-        screen.blit(coord_text, (x + SQUARE_SIZE - 12, y + SQUARE_SIZE - 16))
+        coord_text = _render('coord', file_label, label_color)
+        surface.blit(coord_text, (x + SQUARE_SIZE - 12, y + SQUARE_SIZE - 16))
+    return surface
 
-def draw_pieces(screen, board, board_flipped):
-    """Draws pieces onto the board surface."""
-    for r in range(BOARD_SIZE):
-        for f in range(BOARD_SIZE):
-            piece = board[r][f]
-            if piece != EMPTY_SQUARE:
-                x, y = get_screen_coords((r, f), board_flipped)
-                img = PIECE_IMAGES.get(piece)
-                if img:
-                    screen.blit(img, (x, y))
-                else:
-                    # Fallback text rendering
-                    piece_color = WHITE if get_piece_color(piece) == 'w' else BLACK
-                    text_surf = FONT_PIECE.render(PIECE_TO_SYMBOL.get(piece, piece), True, piece_color)
-                    text_rect = text_surf.get_rect(center=(x + SQUARE_SIZE // 2, y + SQUARE_SIZE // 2))
-                    screen.blit(text_surf, text_rect)
-
-def highlight_square(screen, square, color, board_flipped):
-    """Draws a highlight effect on a given square."""
-    x, y = get_screen_coords(square, board_flipped)
-    highlight_surface = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-    highlight_surface.fill(color)
-    screen.blit(highlight_surface, (x, y))
-
-def draw_highlights(screen, gamestate, board_flipped):
-    """Draws highlights for selected square, last move, check, legal moves."""
+def draw_board(screen, board_flipped):
+    """Draws the checkerboard pattern with subtle coordinate labels."""
+    background = _BOARD_BG.get(board_flipped)
+    if background is None:
+        background = _BOARD_BG[board_flipped] = _render_board_background(board_flipped)
+    screen.blit(background, (0, 0))
+
+def draw_pieces(screen, board_flat, board_flipped):
+    """Draws pieces onto the board surface. board_flat is GameState.board_flat."""
+    img_by_ord = _PIECE_IMG_BY_ORD
+    screen_xy = _SCREEN_XY_FLAT[board_flipped]
+    blit_list = []
+    for i, p in enumerate(board_flat):
+        img = img_by_ord[p]
+        if img is not None:  # EMPTY_SQUARE has no image
+            blit_list.append((img, screen_xy[i]))
+    screen.blits(blit_list, doreturn=False)
+
+def _make_overlay(color):
+    """Creates a square-sized translucent surface filled with color."""
+    overlay = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
+    overlay.fill(color)
+    return overlay
+
+def _make_move_marker(color, radius, width=0):
+    """Creates a square-sized transparent surface with a centered circle (legal move marker)."""
+    marker = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
+    pygame.draw.circle(marker, color, (SQUARE_SIZE // 2, SQUARE_SIZE // 2), radius, width)
+    return marker
+
+# Pre-built overlays, blitted as-is instead of allocating a Surface per highlight.
+# Filled by _build_overlays() from load_images, once the display mode is set.
+_HL_OVERLAYS = {}
+_MOVE_MARKERS = {}
+_PROMO_OVERLAY = None # Full-screen dimming behind the promotion choice
+
+def _build_overlays():
+    """Creates highlight overlays and legal move markers in the display's pixel format."""
+    global _PROMO_OVERLAY
+    _HL_OVERLAYS.clear()
+    for key, color in HIGHLIGHT_COLORS.items():
+        _HL_OVERLAYS[key] = _make_overlay(color).convert_alpha()
+    _MOVE_MARKERS['move'] = _make_move_marker(HIGHLIGHT_COLORS['legal_move'], SQUARE_SIZE // 6).convert_alpha()
+    _MOVE_MARKERS['capture'] = _make_move_marker((0, 0, 0, 40), SQUARE_SIZE // 2 - 3, 5).convert_alpha()
+    _PROMO_OVERLAY = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+    _PROMO_OVERLAY.fill((0, 0, 0, 180))
+    _PROMO_OVERLAY = _PROMO_OVERLAY.convert_alpha()
+    _promotion_box.cache_clear()
+
+def highlight_square(screen, square, color_key, board_flipped):
+    """Draws a highlight effect (HIGHLIGHT_COLORS[color_key]) on a given square."""
+    screen.blit(_HL_OVERLAYS[color_key], get_screen_coords(square, board_flipped))
+
+def _highlight_overlays(gamestate, board_flipped):
+    """Yields (square, overlay surface) pairs in draw order: last move, selection,
+       legal move dots/circles, check."""
     # 1. Previous Move Highlight
     if gamestate.last_move:
         if gamestate.last_move[0] == 'drop':
-            r, f = gamestate.last_move[2]
-            highlight_square(screen, (r,f), HIGHLIGHT_COLORS['previous_move'], board_flipped)
+            yield gamestate.last_move[2], _HL_OVERLAYS['previous_move']
         else:
-            r1, f1 = gamestate.last_move[0]
-            r2, f2 = gamestate.last_move[1]
-            highlight_square(screen, (r1,f1), HIGHLIGHT_COLORS['move_origin'], board_flipped)
-            highlight_square(screen, (r2,f2), HIGHLIGHT_COLORS['previous_move'], board_flipped)
+            yield gamestate.last_move[0], _HL_OVERLAYS['move_origin']
+            yield gamestate.last_move[1], _HL_OVERLAYS['previous_move']
 
     # 2. Selected Square Highlight
     if gamestate.selected_square:
-        highlight_square(screen, gamestate.selected_square, HIGHLIGHT_COLORS['selected'], board_flipped)
+        yield gamestate.selected_square, _HL_OVERLAYS['selected']
 
     # 3. Legal Move Dots/Circles
-    if gamestate.highlighted_moves:
-        for move in gamestate.highlighted_moves:
-            target_r, target_f = -1, -1
-            is_capture = False
-            is_drop = False
-
-            if move[0] == 'drop':
-                if gamestate.selected_drop_piece and move[1].upper() == gamestate.selected_drop_piece:
-                     target_r, target_f = move[2]
-                     is_drop = True
-                else: continue
-            elif gamestate.selected_square and move[0] == gamestate.selected_square:
-                 target_r, target_f = move[1]
-                 if gamestate.board[target_r][target_f] != EMPTY_SQUARE:
-                     is_capture = True
-            else: continue
-
-            target_x, target_y = get_screen_coords((target_r, target_f), board_flipped)
-            center_x = target_x + SQUARE_SIZE // 2
-            center_y = target_y + SQUARE_SIZE // 2
-
-            if is_capture or is_drop:
-                 radius = SQUARE_SIZE // 2 - 3
-                 s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-                 pygame.draw.circle(s, (0, 0, 0, 40), (SQUARE_SIZE//2, SQUARE_SIZE//2), radius, 5)
-                 screen.blit(s, (target_x, target_y))
-            else:
-                radius = SQUARE_SIZE // 6
-                s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-                pygame.draw.circle(s, HIGHLIGHT_COLORS['legal_move'], (SQUARE_SIZE//2, SQUARE_SIZE//2), radius)
-                screen.blit(s, (target_x, target_y))
+    # main fills highlighted_moves only with moves of the selected piece / drop piece
+    board = gamestate.board
+    for move in gamestate.highlighted_moves:
+        if move[0] == 'drop':
+            yield move[2], _MOVE_MARKERS['capture']
+        else:
+            target_r, target_f = move[1]
+            is_capture = board[target_r][target_f] != EMPTY_SQUARE
+            yield move[1], _MOVE_MARKERS['capture' if is_capture else 'move']
 
     # 4. Check Highlight
     player_to_check = gamestate.current_turn if not board_flipped else get_opposite_color(gamestate.current_turn)
@@ -284,7 +364,38 @@ def draw_highlights(screen, gamestate, board_flipped):
     if gamestate.is_in_check(player_to_check):
         king_pos = gamestate.king_pos.get(player_to_check)
         if king_pos:
-            highlight_square(screen, king_pos, HIGHLIGHT_COLORS['check'], board_flipped)
+            yield king_pos, _HL_OVERLAYS['check']
+
+def draw_highlights(screen, gamestate, board_flipped):
+    """Draws highlights for selected square, last move, check, legal moves."""
+    for square, overlay in _highlight_overlays(gamestate, board_flipped):
+        screen.blit(overlay, get_screen_coords(square, board_flipped))
+
+def draw_dirty_squares(screen, gamestate, board_flipped):
+    """Redraws only gamestate.dirty_squares (background tile, piece, highlights),
+       clears the set and returns the screen rects that changed."""
+    dirty = gamestate.dirty_squares
+    if not dirty:
+        return []
+    background = _BOARD_BG.get(board_flipped)
+    if background is None:
+        background = _BOARD_BG[board_flipped] = _render_board_background(board_flipped)
+
+    rects = []
+    for r, f in dirty:
+        x, y = get_screen_coords((r, f), board_flipped)
+        rect = pygame.Rect(x, y, SQUARE_SIZE, SQUARE_SIZE)
+        screen.blit(background, rect, rect)
+        img = _PIECE_IMG_BY_ORD[ord(gamestate.board[r][f])]
+        if img is not None:
+            screen.blit(img, rect)
+        rects.append(rect)
+
+    for square, overlay in _highlight_overlays(gamestate, board_flipped):
+        if square in dirty:
+            screen.blit(overlay, get_screen_coords(square, board_flipped))
+    dirty.clear()
+    return rects
 
 
 def draw_hint(screen, hint_move, board_flipped):
@@ -295,10 +406,7 @@ def draw_hint(screen, hint_move, board_flipped):
     if hint_move[0] == 'drop':
         # For drop moves, highlight the target square
         target_r, target_f = hint_move[2]
-        tx, ty = get_screen_coords((target_r, target_f), board_flipped)
-        s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-        s.fill(HIGHLIGHT_COLORS['hint_to'])
-        screen.blit(s, (tx, ty))
+        highlight_square(screen, (target_r, target_f), 'hint_to', board_flipped)
         return
 
     # Regular move: draw arrow from source to target
@@ -309,12 +417,8 @@ def draw_hint(screen, hint_move, board_flipped):
     tx, ty = get_screen_coords(to_sq, board_flipped)
 
     # Highlight squares
-    s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-    s.fill(HIGHLIGHT_COLORS['hint_from'])
-    screen.blit(s, (fx, fy))
-    s2 = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-    s2.fill(HIGHLIGHT_COLORS['hint_to'])
-    screen.blit(s2, (tx, ty))
+    screen.blit(_HL_OVERLAYS['hint_from'], (fx, fy))
+    screen.blit(_HL_OVERLAYS['hint_to'], (tx, ty))
 
     # Draw arrow
     start_cx = fx + SQUARE_SIZE // 2
@@ -363,14 +467,46 @@ def _draw_button(screen, rect, text, bg_color, text_color=WHITE, border_color=No
     pygame.draw.rect(screen, bg_color, rect, border_radius=6)
     if border_color:
         pygame.draw.rect(screen, border_color, rect, 1, border_radius=6)
-    text_surf = FONT_BUTTON.render(text, True, text_color)
+    text_surf = _render('button', text, text_color)
     screen.blit(text_surf, text_surf.get_rect(center=rect.center))
 
 
+# Side panel rects at fixed positions, set by init_gui (the turn box sits below the title)
+_PANEL_RECT = pygame.Rect(TOTAL_WIDTH, 0, SIDE_PANEL_WIDTH, HEIGHT)
+_TURN_RECT = None
+
+@functools.lru_cache(maxsize=16)
+def _button_rects(y):
+    """Side panel button rects for a button block starting at y, by ui_elements name."""
+    px = TOTAL_WIDTH + 14
+    pw = SIDE_PANEL_WIDTH - 28
+    btn_h = 34
+    btn_w = (pw - 8) // 2
+    rects = {}
+    rects['undo_button'] = pygame.Rect(px, y, btn_w, btn_h)
+    rects['new_game_button'] = pygame.Rect(px + btn_w + 8, y, btn_w, btn_h)
+    y += btn_h + 8
+    rects['toggle_white_ai'] = pygame.Rect(px, y, btn_w, btn_h)
+    rects['toggle_black_ai'] = pygame.Rect(px + btn_w + 8, y, btn_w, btn_h)
+    y += btn_h + 8
+    rects['toggle_hint'] = pygame.Rect(px, y, pw, btn_h)
+    y += btn_h + 6
+    rects['toggle_flip'] = pygame.Rect(px, y, pw, btn_h)
+    return rects
+
+@functools.lru_cache(maxsize=64)
+def _hand_strip(piece_char, count):
+    """A row of `count` hand thumbnails of one piece, HAND_PIECE_PAD apart, as a single surface."""
+    step = HAND_PIECE_SIZE + HAND_PIECE_PAD
+    strip = pygame.Surface((count * step - HAND_PIECE_PAD, HAND_PIECE_SIZE), pygame.SRCALPHA)
+    img = PIECE_IMAGES_HAND[piece_char]
+    # RGBA_MAX onto a fully transparent surface copies the pixels as-is (no alpha blending)
+    strip.blits([(img, (i * step, 0), None, pygame.BLEND_RGBA_MAX) for i in range(count)], doreturn=False)
+    return strip.convert_alpha()
+
 def draw_side_panel(screen, gamestate, show_hint=False, hint_move=None, board_flipped=False):
     """Draws the side panel with captured pieces, controls, status."""
-    panel_rect = pygame.Rect(TOTAL_WIDTH, 0, SIDE_PANEL_WIDTH, HEIGHT)
-    pygame.draw.rect(screen, INFO_BG_COLOR, panel_rect)
+    pygame.draw.rect(screen, INFO_BG_COLOR, _PANEL_RECT)
 
     # Subtle left border
     pygame.draw.line(screen, (60, 58, 55), (TOTAL_WIDTH, 0), (TOTAL_WIDTH, HEIGHT), 2)
@@ -384,7 +520,7 @@ def draw_side_panel(screen, gamestate, show_hint=False, hint_move=None, board_fl
     pw = SIDE_PANEL_WIDTH - 28  # usable width
 
     # ─── Title ───
-    title = FONT_TITLE.render("Mini Crazyhouse 6×6", True, (220, 220, 220))
+    title = _render('title', "Mini Crazyhouse 6×6", (220, 220, 220))
     screen.blit(title, (TOTAL_WIDTH + (SIDE_PANEL_WIDTH - title.get_width()) // 2, y))
     y += title.get_height() + 12
 
@@ -392,21 +528,23 @@ def draw_side_panel(screen, gamestate, show_hint=False, hint_move=None, board_fl
     is_white = gamestate.current_turn == 'w'
     turn_str = "● Ход белых" if is_white else "● Ход чёрных"
     dot_color = (240, 240, 240) if is_white else (80, 80, 80)
-    turn_rect = pygame.Rect(px, y, pw, 30)
+    turn_rect = _TURN_RECT
     pygame.draw.rect(screen, (52, 50, 48), turn_rect, border_radius=5)
-    turn_surf = FONT_INFO.render(turn_str, True, (200, 200, 200))
+    turn_surf = _render('info', turn_str, (200, 200, 200))
     screen.blit(turn_surf, turn_surf.get_rect(center=turn_rect.center))
     # Small color dot
     pygame.draw.circle(screen, dot_color, (px + 16, y + 15), 5)
     y += 38
 
     # ─── Hands (captured pieces) ───
-    piece_size_hand = 32
-    hand_pad = 4
+    piece_size_hand = HAND_PIECE_SIZE
+    hand_pad = HAND_PIECE_PAD
+    hand_step = piece_size_hand + hand_pad
+    hand_right = TOTAL_WIDTH + SIDE_PANEL_WIDTH - 14
 
     for color in ['w', 'b']:
         label = "Рука белых" if color == 'w' else "Рука чёрных"
-        label_surf = FONT_STATUS.render(label, True, (160, 160, 160))
+        label_surf = _render('status', label, (160, 160, 160))
         screen.blit(label_surf, (px, y))
         y += label_surf.get_height() + 4
 
@@ -417,34 +555,42 @@ def draw_side_panel(screen, gamestate, show_hint=False, hint_move=None, board_fl
 
         hand_sorted = sorted(gamestate.hands[color].items())
         has_pieces = False
+        blit_list = []  # thumbnails go out in one blits() call after the selection frames
 
         for piece_type, total_count in hand_sorted:
             if total_count <= 0:
                 continue
             has_pieces = True
-            piece_char = piece_to_upper(piece_type) if color == 'w' else piece_to_lower(piece_type)
-            piece_img = PIECE_IMAGES.get(piece_char)
-            if not piece_img:
+            piece_char = _HAND_CHAR[(color, piece_type)]
+            scaled_img = PIECE_IMAGES_HAND.get(piece_char)
+            if not scaled_img:
                 continue
-            scaled_img = pygame.transform.smoothscale(piece_img, (piece_size_hand, piece_size_hand))
 
             if piece_type not in ui_elements['hand_pieces'][color]:
                 ui_elements['hand_pieces'][color][piece_type] = []
+            piece_rects = ui_elements['hand_pieces'][color][piece_type]
+            is_selected = gamestate.current_turn == color and gamestate.selected_drop_piece == piece_type
 
-            for _ in range(total_count):
-                if current_x + piece_size_hand > TOTAL_WIDTH + SIDE_PANEL_WIDTH - 14:
+            # One strip blit per row segment; per-piece rects are only computed for clicks
+            remaining = total_count
+            while remaining:
+                if current_x + piece_size_hand > hand_right:
                     y += piece_size_hand + hand_pad
                     current_x = px
+                n = min(remaining, (hand_right - current_x + hand_pad) // hand_step)
 
-                piece_rect = pygame.Rect(current_x, y, piece_size_hand, piece_size_hand)
-                ui_elements['hand_pieces'][color][piece_type].append(piece_rect)
+                for i in range(n):
+                    piece_rect = pygame.Rect(current_x + i * hand_step, y, piece_size_hand, piece_size_hand)
+                    piece_rects.append(piece_rect)
+                    if is_selected:
+                        sel_rect = piece_rect.inflate(4, 4)
+                        pygame.draw.rect(screen, HIGHLIGHT_COLORS['selected'], sel_rect, border_radius=3)
 
-                if gamestate.current_turn == color and gamestate.selected_drop_piece == piece_type:
-                    sel_rect = piece_rect.inflate(4, 4)
-                    pygame.draw.rect(screen, HIGHLIGHT_COLORS['selected'], sel_rect, border_radius=3)
+                blit_list.append((_hand_strip(piece_char, n), (current_x, y)))
+                current_x += n * hand_step
+                remaining -= n
 
-                screen.blit(scaled_img, piece_rect.topleft)
-                current_x += piece_size_hand + hand_pad
+        screen.blits(blit_list, doreturn=False)
 
         # Advance y after drawing hand pieces
         max_y = row_start_y
@@ -458,64 +604,45 @@ def draw_side_panel(screen, gamestate, show_hint=False, hint_move=None, board_fl
     y += 10
 
     # ─── Buttons ───
-    btn_h = 34
-    btn_w = (pw - 8) // 2
+    # Geometry depends only on where the hands end; rects are cached per y
+    buttons = _button_rects(y)
+    ui_elements['buttons'].update(buttons)
+    y = buttons['toggle_flip'].bottom + 6
 
     # Row 1: Undo + New Game
-    undo_rect = pygame.Rect(px, y, btn_w, btn_h)
-    _draw_button(screen, undo_rect, "⟲ Отменить", HIGHLIGHT_COLORS['undo'])
-    ui_elements['buttons']['undo_button'] = undo_rect
-
-    if gamestate.checkmate or gamestate.stalemate:
-        ng_rect = pygame.Rect(px + btn_w + 8, y, btn_w, btn_h)
-        _draw_button(screen, ng_rect, "Новая игра", (30, 130, 60))
-        ui_elements['buttons']['new_game_button'] = ng_rect
-    else:
-        ng_rect = pygame.Rect(px + btn_w + 8, y, btn_w, btn_h)
-        _draw_button(screen, ng_rect, "Новая игра", (60, 60, 58))
-        ui_elements['buttons']['new_game_button'] = ng_rect
-    y += btn_h + 8
+    _draw_button(screen, buttons['undo_button'], "⟲ Отменить", HIGHLIGHT_COLORS['undo'])
+    ng_bg = (30, 130, 60) if (gamestate.checkmate or gamestate.stalemate) else (60, 60, 58)
+    _draw_button(screen, buttons['new_game_button'], "Новая игра", ng_bg)
 
     # Row 2: AI toggles
     ai_w_active = gamestate.white_ai_enabled
     ai_b_active = gamestate.black_ai_enabled
-    tw_rect = pygame.Rect(px, y, btn_w, btn_h)
-    tb_rect = pygame.Rect(px + btn_w + 8, y, btn_w, btn_h)
-    _draw_button(screen, tw_rect,
+    _draw_button(screen, buttons['toggle_white_ai'],
                  f"ИИ Б: {'ВКЛ' if ai_w_active else 'выкл'}",
                  HIGHLIGHT_COLORS['toggle_ai_active'] if ai_w_active else HIGHLIGHT_COLORS['toggle_ai'])
-    _draw_button(screen, tb_rect,
+    _draw_button(screen, buttons['toggle_black_ai'],
                  f"ИИ Ч: {'ВКЛ' if ai_b_active else 'выкл'}",
                  HIGHLIGHT_COLORS['toggle_ai_active'] if ai_b_active else HIGHLIGHT_COLORS['toggle_ai'])
-    ui_elements['buttons']['toggle_white_ai'] = tw_rect
-    ui_elements['buttons']['toggle_black_ai'] = tb_rect
-    y += btn_h + 8
 
     # Row 3: Hint toggle (full width)
-    hint_rect = pygame.Rect(px, y, pw, btn_h)
     hint_bg = HIGHLIGHT_COLORS['hint_active'] if show_hint else HIGHLIGHT_COLORS['hint']
     hint_label = "💡 Подсказка: ВКЛ" if show_hint else "💡 Подсказка: выкл"
-    _draw_button(screen, hint_rect, hint_label, hint_bg)
-    ui_elements['buttons']['toggle_hint'] = hint_rect
-    y += btn_h + 6
+    _draw_button(screen, buttons['toggle_hint'], hint_label, hint_bg)
 
     # Row 4: Flip board toggle (full width)
-    flip_rect = pygame.Rect(px, y, pw, btn_h)
     flip_bg = (80, 120, 80) if board_flipped else (60, 60, 58)
     flip_label = "🔄 Доска: перевёрнута" if board_flipped else "🔄 Перевернуть доску"
-    _draw_button(screen, flip_rect, flip_label, flip_bg)
-    ui_elements['buttons']['toggle_flip'] = flip_rect
-    y += btn_h + 6
+    _draw_button(screen, buttons['toggle_flip'], flip_label, flip_bg)
 
     # Hint status text
     if show_hint and hint_move:
         from utils import format_move_for_print
         hint_text = f"Лучший ход: {format_move_for_print(hint_move)}"
-        hint_surf = FONT_STATUS.render(hint_text, True, (130, 210, 255))
+        hint_surf = _render('status', hint_text, (130, 210, 255))
         screen.blit(hint_surf, (px + 4, y))
         y += hint_surf.get_height() + 4
     elif show_hint:
-        thinking = FONT_STATUS.render("Считаю…", True, (160, 160, 160))
+        thinking = _render('status', "Считаю…", (160, 160, 160))
         screen.blit(thinking, (px + 4, y))
         y += thinking.get_height() + 4
 
@@ -539,7 +666,7 @@ def draw_side_panel(screen, gamestate, show_hint=False, hint_move=None, board_fl
     if status_text:
         status_rect = pygame.Rect(px, y, pw, 36)
         pygame.draw.rect(screen, (50, 48, 46), status_rect, border_radius=5)
-        status_surf = FONT_STATUS.render(status_text, True, status_color)
+        status_surf = _render('status', status_text, status_color)
         screen.blit(status_surf, status_surf.get_rect(center=status_rect.center))
         y += status_rect.height + 8
 
@@ -553,6 +680,19 @@ def draw_info_panel(screen, gamestate):
     pass
 
 
+@functools.lru_cache(maxsize=4)
+def _promotion_box(num_choices):
+    """Promotion container (border, background, button frames) for num_choices pieces."""
+    box_width = SQUARE_SIZE * num_choices
+    surface = pygame.Surface((box_width + 20, SQUARE_SIZE + 20), pygame.SRCALPHA)
+    pygame.draw.rect(surface, (50, 50, 50), surface.get_rect(), border_radius=5)
+    pygame.draw.rect(surface, WHITE, surface.get_rect(), 2, border_radius=5)
+    for i in range(num_choices):
+        button_rect = pygame.Rect(10 + i * SQUARE_SIZE, 10, SQUARE_SIZE, SQUARE_SIZE)
+        pygame.draw.rect(surface, BUTTON_COLOR, button_rect)
+        pygame.draw.rect(surface, WHITE, button_rect, 1) # Outline
+    return surface.convert_alpha()
+
 def draw_promotion_choice(screen, gamestate):
     """Draws the promotion selection interface."""
     if not gamestate.needs_promotion_choice or not gamestate.promotion_square:
@@ -563,10 +703,8 @@ def draw_promotion_choice(screen, gamestate):
     promotion_pieces = PROMOTION_PIECES_WHITE_STR if promoting_color == 'w' else PROMOTION_PIECES_BLACK_STR
     # Queen is not allowed by rules, so available pieces are R, N, B
 
-    # Overlay to dim the background
-    overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 180))
-    screen.blit(overlay, (0, 0))
+    # Overlay to dim the background (pre-built in _build_overlays)
+    screen.blit(_PROMO_OVERLAY, (0, 0))
 
     # Box dimensions and position (centered?)
     num_choices = len(promotion_pieces)
@@ -575,9 +713,8 @@ def draw_promotion_choice(screen, gamestate):
     box_x = (WIDTH - box_width) // 2
     box_y = (HEIGHT - box_height) // 2
 
-    # Draw the container box
-    pygame.draw.rect(screen, (50, 50, 50), (box_x - 10, box_y - 10, box_width + 20, box_height + 20), border_radius=5)
-    pygame.draw.rect(screen, WHITE, (box_x - 10, box_y - 10, box_width + 20, box_height + 20), 2, border_radius=5)
+    # Container box with empty buttons, cached by number of choices
+    screen.blit(_promotion_box(num_choices), (box_x - 10, box_y - 10))
 
     promotion_buttons = {} # Store rects for click detection
 
@@ -585,17 +722,13 @@ def draw_promotion_choice(screen, gamestate):
         piece_char = piece_char_upper if promoting_color == 'w' else piece_to_lower(piece_char_upper)
         button_rect = pygame.Rect(box_x + i * SQUARE_SIZE, box_y, SQUARE_SIZE, SQUARE_SIZE)
 
-        # Draw button background
-        pygame.draw.rect(screen, BUTTON_COLOR, button_rect)
-        pygame.draw.rect(screen, WHITE, button_rect, 1) # Outline
-
         # Draw piece image inside button
         img = PIECE_IMAGES.get(piece_char)
         if img:
             img_rect = img.get_rect(center=button_rect.center)
             screen.blit(img, img_rect)
         else: # Fallback text
-            text_surf = FONT_PIECE.render(piece_char, True, WHITE)
+            text_surf = _render('piece', piece_char, WHITE)
             text_rect = text_surf.get_rect(center=button_rect.center)
             screen.blit(text_surf, text_rect)
 
@@ -637,6 +770,7 @@ def handle_promotion_choice(mouse_pos, promotion_buttons):
 
 def draw_game_state(screen, gamestate, board_flipped=False, show_hint=False, hint_move=None):
     """Main drawing function called each frame."""
+    assert FONT_INFO is not None, "init_gui() must be called before drawing"
     # 1. Draw Board and Pieces
     draw_board(screen, board_flipped)
 
@@ -644,7 +778,7 @@ def draw_game_state(screen, gamestate, board_flipped=False, show_hint=False, hin
     if show_hint and hint_move:
         draw_hint(screen, hint_move, board_flipped)
 
-    draw_pieces(screen, gamestate.board, board_flipped)
+    draw_pieces(screen, gamestate.board_flat, board_flipped)
 
     # 3. Draw Highlights (selected, legal moves, check, last move)
     draw_highlights(screen, gamestate, board_flipped)
@@ -662,4 +796,16 @@ def draw_game_state(screen, gamestate, board_flipped=False, show_hint=False, hin
              ui_elements['promotion_buttons'] = {}
         ui_elements['promotion_buttons'] = promotion_buttons
 
-    return ui_elements
\ No newline at end of file
+    gamestate.dirty_squares.clear() # Everything is up to date now
+    return ui_elements
+
+
+def draw_game_state_dirty(screen, gamestate, board_flipped=False, show_hint=False, hint_move=None):
+    """Partial redraw: only the squares in gamestate.dirty_squares plus the side panel.
+       Returns (ui_elements, rects to pass to pygame.display.update).
+       Hint arrows and the promotion overlay span several squares - use draw_game_state for those."""
+    assert FONT_INFO is not None, "init_gui() must be called before drawing"
+    dirty_rects = draw_dirty_squares(screen, gamestate, board_flipped)
+    ui_elements = draw_side_panel(screen, gamestate, show_hint=show_hint, hint_move=hint_move, board_flipped=board_flipped)
+    dirty_rects.append(_PANEL_RECT)
+    return ui_elements, dirty_rects
\ No newline at end of file
@@ -2,7 +2,6 @@
 # --- Imports ---
 import pygame
 import sys
-import copy
 import random
 import time
 import math
@@ -28,6 +27,9 @@ def main():
 
     print("Запуск main()")
 
+    # Инициализация pygame и шрифтов
+    init_gui()
+
     # Инициализация экрана
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Mini Crazyhouse 6×6")
@@ -69,6 +71,8 @@ def main():
     board_flipped = False
 
     running = True
+    needs_full_redraw = True  # Full frame after input/UI changes; moves alone redraw dirty squares
+    needs_present = False     # Window exposed: the display surface still holds the last frame, just flip it
     print("Начинаем игровой цикл")
 
     # Check if AI should make the first move
@@ -89,10 +93,7 @@ def main():
         if is_current_ai or gamestate.checkmate or gamestate.stalemate:
             hint_move = None
             return
-        try:
-            pos_hash = ai.get_position_hash(gamestate)
-        except Exception:
-            pos_hash = None
+        pos_hash = gamestate.zobrist_key
         if pos_hash == hint_position_hash and hint_move is not None:
             return  # Already have hint for this position
         hint_move = None
@@ -102,21 +103,128 @@ def main():
         hint_thread = HintThread(gamestate, depth=gamestate.ai_depth)
         hint_thread.start()
 
+    def start_ai_move():
+        """Start the AI thread for the side to move."""
+        nonlocal making_ai_move, ai_thread
+        making_ai_move = True
+        ai_thread = AIThread(gamestate, gamestate.ai_depth)
+        ai_thread.start()
+
+    def after_player_move():
+        """Common logic after a successful player move."""
+        nonlocal hint_move, hint_position_hash
+        hint_move = None
+        hint_position_hash = None
+        if not (gamestate.checkmate or gamestate.stalemate):
+             is_next_player_ai = (gamestate.current_turn == 'w' and gamestate.white_ai_enabled) or \
+                                 (gamestate.current_turn == 'b' and gamestate.black_ai_enabled)
+             if is_next_player_ai:
+                  start_ai_move()
+             else:
+                  start_hint_if_needed()
+
+    # --- Button Handlers (dispatched by button name from ui_elements['buttons']) ---
+
+    def on_undo():
+        nonlocal making_ai_move, ai_thread, hint_move, hint_position_hash
+        print("Attempting to undo two half-moves...")
+        undone_ai_move = gamestate.undo_move()
+        if undone_ai_move:
+            print("Successfully undid AI's move.")
+            undone_player_move = gamestate.undo_move()
+            if undone_player_move:
+                print("Successfully undid Player's move. Your turn.")
+                making_ai_move = False
+                if ai_thread:
+                    try: ai_thread.join(timeout=0.1)
+                    except: pass
+                    ai_thread = None
+                hint_move = None
+                hint_position_hash = None
+                start_hint_if_needed()
+            else:
+                print("Could not undo Player's move.")
+        else:
+            print("Cannot undo any further.")
+
+    def on_new_game():
+        nonlocal making_ai_move, ai_thread, hint_move, hint_position_hash
+        print("Starting new game...")
+        gamestate.setup_initial_board()
+        making_ai_move = False
+        ai_thread = None
+        hint_move = None
+        hint_position_hash = None
+        if gamestate.current_turn == 'b' and gamestate.black_ai_enabled:
+            print("AI Black to make the first move in new game.")
+            start_ai_move()
+        else:
+            start_hint_if_needed()
+
+    def toggle_ai(color):
+        nonlocal hint_move, hint_position_hash
+        if color == 'w':
+            gamestate.white_ai_enabled = enabled = not gamestate.white_ai_enabled
+            print(f"White AI: {enabled}")
+        else:
+            gamestate.black_ai_enabled = enabled = not gamestate.black_ai_enabled
+            print(f"Black AI: {enabled}")
+        if gamestate.current_turn == color and enabled and not making_ai_move:
+            start_ai_move()
+        hint_move = None
+        hint_position_hash = None
+        start_hint_if_needed()
+
+    def on_toggle_hint():
+        nonlocal show_hint, hint_move, hint_position_hash
+        show_hint = not show_hint
+        print(f"Hints: {'ON' if show_hint else 'OFF'}")
+        hint_move = None
+        hint_position_hash = None
+        if show_hint:
+            start_hint_if_needed()
+
+    def on_toggle_flip():
+        nonlocal board_flipped
+        board_flipped = not board_flipped
+        print(f"Board flipped: {board_flipped}")
+
+    button_handlers = {
+        'undo_button': on_undo,
+        'new_game_button': on_new_game,
+        'toggle_white_ai': lambda: toggle_ai('w'),
+        'toggle_black_ai': lambda: toggle_ai('b'),
+        'toggle_hint': on_toggle_hint,
+        'toggle_flip': on_toggle_flip,
+    }
+
     start_hint_if_needed()
+    idle_event = None  # event returned by the idle wait, dispatched before newer ones
 
     while running:
         current_time = time.time()
 
-        # Draw everything
-        screen.fill(INFO_BG_COLOR)
-        ui_elements = draw_game_state(screen, gamestate, board_flipped=board_flipped,
-                                       show_hint=show_hint, hint_move=hint_move)
-        pygame.display.flip()
+        # Draw: everything after input/UI changes, otherwise only the squares moves touched
+        if needs_full_redraw:
+            screen.fill(INFO_BG_COLOR)
+            ui_elements = draw_game_state(screen, gamestate, board_flipped=board_flipped,
+                                           show_hint=show_hint, hint_move=hint_move)
+            pygame.display.flip()
+            needs_full_redraw = False
+            needs_present = False
+        elif gamestate.dirty_squares:
+            ui_elements, dirty_rects = draw_game_state_dirty(screen, gamestate, board_flipped=board_flipped,
+                                                             show_hint=show_hint, hint_move=hint_move)
+            pygame.display.update(dirty_rects)
+        if needs_present:
+            pygame.display.flip()
+            needs_present = False
 
         # --- Check hint thread completion ---
         if hint_thread and hint_thread.done:
             hint_move = hint_thread.best_move
             hint_thread = None
+            needs_full_redraw = True
 
         # --- Handle AI Move Completion (with delay) ---
         if making_ai_move and ai_thread and ai_thread.done:
@@ -151,7 +259,9 @@ def main():
                         gamestate.complete_promotion(prom_char)
                     gamestate.save_state()
                     print("AI move successful.")
-                    ai.save_move_cache_to_db(ai.move_cache)
+                    if show_hint:
+                        needs_full_redraw = True  # Old hint arrow spans several squares
+                    ai.save_move_cache_to_db_async()
                     # Recalculate hint for new position
                     hint_move = None
                     hint_position_hash = None
@@ -165,7 +275,16 @@ def main():
         clicked_hand_piece_type = None
         clicked_promotion_choice = None
 
-        for event in pygame.event.get():
+        events = pygame.event.get()
+        if idle_event is not None:
+            events.insert(0, idle_event)
+            idle_event = None
+        for event in events:
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                needs_full_redraw = True
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                needs_present = True
+
             if event.type == pygame.QUIT:
                 running = False
                 print("Quit event received.")
@@ -216,91 +335,10 @@ def main():
 
         # --- Process Clicks and Game Logic (Outside Event Loop) ---
 
-        def after_player_move():
-            """Common logic after a successful player move."""
-            nonlocal making_ai_move, ai_thread, hint_move, hint_position_hash
-            hint_move = None
-            hint_position_hash = None
-            if not (gamestate.checkmate or gamestate.stalemate):
-                 is_next_player_ai = (gamestate.current_turn == 'w' and gamestate.white_ai_enabled) or \
-                                     (gamestate.current_turn == 'b' and gamestate.black_ai_enabled)
-                 if is_next_player_ai:
-                      making_ai_move = True
-                      ai_thread = AIThread(gamestate, gamestate.ai_depth)
-                      ai_thread.start()
-                 else:
-                      start_hint_if_needed()
-
         # Handle Button Clicks
         if clicked_button_info and not making_ai_move:
             print(f"Button clicked: {clicked_button_info}")
-            if clicked_button_info == 'undo_button':
-                print("Attempting to undo two half-moves...")
-                undone_ai_move = gamestate.undo_move()
-                if undone_ai_move:
-                    print("Successfully undid AI's move.")
-                    undone_player_move = gamestate.undo_move()
-                    if undone_player_move:
-                        print("Successfully undid Player's move. Your turn.")
-                        making_ai_move = False
-                        if ai_thread:
-                            try: ai_thread.join(timeout=0.1)
-                            except: pass
-                            ai_thread = None
-                        hint_move = None
-                        hint_position_hash = None
-                        start_hint_if_needed()
-                    else:
-                        print("Could not undo Player's move.")
-                else:
-                    print("Cannot undo any further.")
-            elif clicked_button_info == 'new_game_button':
-                print("Starting new game...")
-                gamestate.setup_initial_board()
-                making_ai_move = False
-                if ai_thread: ai_thread = None
-                hint_move = None
-                hint_position_hash = None
-                if gamestate.current_turn == 'b' and gamestate.black_ai_enabled:
-                    print("AI Black to make the first move in new game.")
-                    making_ai_move = True
-                    ai_thread = AIThread(gamestate, gamestate.ai_depth)
-                    ai_thread.start()
-                else:
-                    start_hint_if_needed()
-            elif clicked_button_info == 'toggle_white_ai':
-                 gamestate.white_ai_enabled = not gamestate.white_ai_enabled
-                 print(f"White AI: {gamestate.white_ai_enabled}")
-                 if gamestate.current_turn == 'w' and gamestate.white_ai_enabled and not making_ai_move:
-                      making_ai_move = True
-                      ai_thread = AIThread(gamestate, gamestate.ai_depth)
-                      ai_thread.start()
-                 hint_move = None
-                 hint_position_hash = None
-                 start_hint_if_needed()
-            elif clicked_button_info == 'toggle_black_ai':
-                 gamestate.black_ai_enabled = not gamestate.black_ai_enabled
-                 print(f"Black AI: {gamestate.black_ai_enabled}")
-                 if gamestate.current_turn == 'b' and gamestate.black_ai_enabled and not making_ai_move:
-                      making_ai_move = True
-                      ai_thread = AIThread(gamestate, gamestate.ai_depth)
-                      ai_thread.start()
-                 hint_move = None
-                 hint_position_hash = None
-                 start_hint_if_needed()
-            elif clicked_button_info == 'toggle_hint':
-                 show_hint = not show_hint
-                 print(f"Hints: {'ON' if show_hint else 'OFF'}")
-                 if show_hint:
-                     hint_move = None
-                     hint_position_hash = None
-                     start_hint_if_needed()
-                 else:
-                     hint_move = None
-                     hint_position_hash = None
-            elif clicked_button_info == 'toggle_flip':
-                 board_flipped = not board_flipped
-                 print(f"Board flipped: {board_flipped}")
+            button_handlers[clicked_button_info]()
             clicked_button_info = None
 
         # Handle Promotion Choice Click
@@ -337,12 +375,7 @@ def main():
             # Case 1: Drop move
             if gamestate.selected_drop_piece:
                 drop_move = ('drop', gamestate.selected_drop_piece, clicked_square)
-                is_legal_drop = False
-                for legal_move in gamestate.highlighted_moves:
-                    if is_same_move(drop_move, legal_move):
-                        is_legal_drop = True
-                        break
-                if is_legal_drop:
+                if drop_move in gamestate.highlighted_moves:
                     print(f"Attempting drop: {format_move_for_print(drop_move)}")
                     if gamestate.make_move(drop_move):
                         gamestate.save_state()
@@ -415,14 +448,20 @@ def main():
         if is_current_player_ai and not making_ai_move and not gamestate.needs_promotion_choice \
            and not gamestate.checkmate and not gamestate.stalemate:
              print(f"AI's turn ({gamestate.current_turn}). Starting calculation.")
-             making_ai_move = True
-             ai_thread = AIThread(gamestate, gamestate.ai_depth)
-             ai_thread.start()
+             start_ai_move()
 
-        clock.tick(FPS)
+        # Nothing to draw and no AI move waiting out its delay: sleep until input or
+        # AI_DONE_EVENT from a finished thread instead of waking up FPS times a second
+        if needs_full_redraw or needs_present or gamestate.dirty_squares or ai_move_ready_time is not None:
+            clock.tick(FPS)
+        else:
+            event = pygame.event.wait(IDLE_WAIT_MS)
+            if event.type != pygame.NOEVENT:
+                idle_event = event  # Not re-posted: that would queue it behind newer input
 
     # --- End of Game Loop ---
     print("Exiting game loop.")
+    ai.save_move_cache_to_db()  # Flush whatever the background writer has not saved yet
     pygame.quit()
     sys.exit()
 
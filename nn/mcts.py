@@ -1,75 +1,193 @@
 import math
-import copy
 from collections import defaultdict
+import numpy as np
+try:
+    from numba import njit
+except ImportError:
+    njit = None  # _select_path runs as plain numpy code
 
 def softmax(x):
-    max_x = max(x)
-    exps = [math.exp(i - max_x) for i in x]
-    s = sum(exps)
-    return [j / s for j in exps]
+    x = np.asarray(x, dtype=np.float64)
+    e = np.exp(x - x.max())
+    return (e / e.sum()).tolist()
 
-class MCTSNode:
-    def __init__(self, state, prior):
-        self.state = state
-        self.prior = prior  # P(s,a)
-        self.children = {}  # move -> MCTSNode
-        self.N = 0          # visits
-        self.W = 0.0        # total value
-        self.Q = 0.0        # mean value W/N
+def _select_path(N, W, P, first_child, n_children, c_puct, path):
+    """PUCT descent over the flat tree from the root (node 0).
+       Writes visited node ids to path[0..depth] and returns depth.
+       Only arrays and scalars, so it compiles unchanged with numba.njit."""
+    node = 0
+    depth = 0
+    path[0] = 0
+    while n_children[node] > 0:
+        lo = first_child[node]
+        hi = lo + n_children[node]
+        n = N[lo:hi]
+        # Q + U; unvisited children have W = 0, so Q = 0
+        scores = W[lo:hi] / np.maximum(n, 1) + c_puct * P[lo:hi] * math.sqrt(N[node]) / (1 + n)
+        node = lo + np.argmax(scores)
+        depth += 1
+        path[depth] = node
+    return depth
+
+if njit is not None:
+    _select_path = njit(cache=True)(_select_path)
+
+class MCTSTree:
+    """Search tree as flat arrays indexed by node id; node 0 is the root.
+       Children of a node occupy ids first_child .. first_child + n_children - 1.
+       Nodes keep no GameState: the search replays moves on one shared state
+       (make_ai_move while descending, undo_ai_move afterwards)."""
+    def __init__(self, capacity=1024):
+        self.N = np.zeros(capacity, dtype=np.int32)      # visits
+        self.W = np.zeros(capacity, dtype=np.float64)    # total value
+        self.P = np.zeros(capacity, dtype=np.float64)    # prior P(s,a)
+        self.first_child = np.zeros(capacity, dtype=np.int32)
+        self.n_children = np.zeros(capacity, dtype=np.int32)
+        self.moves = [None]  # move leading to each node (None for the root)
+        self.size = 1
+        self.P[0] = 1.0
+
+    def _grow(self, needed):
+        capacity = len(self.N)
+        while capacity < needed:
+            capacity *= 2
+        for name in ('N', 'W', 'P', 'first_child', 'n_children'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def expand(self, node, action_probs):
+        k = len(action_probs)
+        lo = self.size
+        if lo + k > len(self.N):
+            self._grow(lo + k)
+        self.first_child[node] = lo
+        self.n_children[node] = k
+        for i, (move, prob) in enumerate(action_probs):
+            self.P[lo + i] = prob
+            self.moves.append(move)
+        self.size = lo + k
+
+    def children(self, node):
+        lo = int(self.first_child[node])
+        return range(lo, lo + int(self.n_children[node]))
+
+    def subtree(self, node):
+        """Copy of the subtree under node as a new tree with node as the root.
+           Breadth-first, so the children of each node stay contiguous."""
+        new = MCTSTree(capacity=max(1024, self.size))
+        new.N[0], new.W[0] = self.N[node], self.W[node]
+        queue = [(node, 0)]
+        for old, new_id in queue:
+            k = int(self.n_children[old])
+            if k == 0:
+                continue
+            lo, new_lo = int(self.first_child[old]), new.size
+            new.first_child[new_id] = new_lo
+            new.n_children[new_id] = k
+            for name in ('N', 'W', 'P'):
+                getattr(new, name)[new_lo:new_lo + k] = getattr(self, name)[lo:lo + k]
+            new.moves.extend(self.moves[lo:lo + k])
+            new.size = new_lo + k
+            queue.extend((lo + i, new_lo + i) for i in range(k))
+        return new
 
 class MCTS:
-    def __init__(self, policy_value_fn, c_puct=1.0, n_iters=1000):
+    def __init__(self, policy_value_fn, c_puct=1.0, n_iters=1000, batch_size=16, virtual_loss=1):
         """
-        policy_value_fn: function(state) -> (action_probs, value)
+        policy_value_fn: function(states) -> list of (action_probs, value), one per state
           action_probs: list of (move, probability)
           value: scalar in [-1,1]
+        batch_size: leaves collected per policy_value_fn call. Pending paths get a
+          virtual loss (in visits) so the walks of one batch spread over different leaves.
         """
         self.policy_value_fn = policy_value_fn
         self.c_puct = c_puct
         self.n_iters = n_iters
-        self.root = None
+        self.batch_size = batch_size
+        self.virtual_loss = virtual_loss
+        self.tree = None
+        self.next_tree = None  # subtree kept by update_with_move for the next search
 
     def search(self, initial_state):
-        """Run MCTS starting from initial_state."""
-        self.root = MCTSNode(state=initial_state, prior=1.0)
-        for _ in range(self.n_iters):
-            node = self.root
-            path = []
-            # selection
-            while node.children:
-                move, node = max(
-                    node.children.items(),
-                    key=lambda item: item[1].Q + self.c_puct * item[1].prior * math.sqrt(node.N) / (1 + item[1].N)
-                )
-                path.append((node, move))
-            # expansion
-            state = node.state
-            action_probs, value = self.policy_value_fn(state)
-            for move, prob in action_probs:
-                next_state = copy.deepcopy(state)
-                next_state.make_move(move)
-                node.children[move] = MCTSNode(next_state, prior=prob)
-            # backpropagation
-            for parent, _move in reversed(path):
-                parent.N += 1
-                parent.W += value
-                parent.Q = parent.W / parent.N
-            # update root N
-            self.root.N += 1
+        """Run MCTS starting from initial_state.
+           initial_state is used as the working position and is restored before returning."""
+        state = initial_state
+        vloss = self.virtual_loss
+        tree = self.next_tree if self.next_tree is not None else MCTSTree()
+        self.tree, self.next_tree = tree, None
+        # tree depth <= number of expansions, including those of a reused subtree
+        path_buf = np.zeros(tree.size + self.n_iters + 1, dtype=np.int32)
+        done = 0
+        if tree.n_children[0] == 0:
+            # expand the root on its own: otherwise every walk of the first batch stops at
+            # node 0 and the batch evaluates the same position batch_size times.
+            # This evaluation is the root's own visit, so N[0] = 1 + sum of the children's N
+            (action_probs, _value), = self.policy_value_fn([state.fast_copy_for_simulation()])
+            tree.expand(0, action_probs)
+            tree.N[0] += 1
+            done = 1
+        while done < self.n_iters and tree.n_children[0] > 0:
+            # selection: collect a batch of leaves under virtual loss
+            leaves = []
+            for _ in range(min(self.batch_size, self.n_iters - done)):
+                depth = _select_path(tree.N, tree.W, tree.P, tree.first_child, tree.n_children,
+                                     self.c_puct, path_buf)
+                path = path_buf[1:depth + 1].copy()  # root excluded
+                for node in path.tolist():
+                    state.make_ai_move(tree.moves[node])
+                np.add.at(tree.N, path, vloss)
+                np.add.at(tree.W, path, -vloss)
+                leaf = int(path_buf[depth])
+                leaves.append((leaf, path, state.fast_copy_for_simulation()))
+                for _ in range(depth):
+                    state.undo_ai_move()
+            # evaluation: one network call for the whole batch
+            results = self.policy_value_fn([leaf_state for _leaf, _path, leaf_state in leaves])
+            for (leaf, path, _leaf_state), (action_probs, value) in zip(leaves, results):
+                # expansion (the same leaf can be picked twice in one batch)
+                if tree.n_children[leaf] == 0:
+                    tree.expand(leaf, action_probs)
+                # backpropagation, removing the virtual loss
+                np.add.at(tree.N, path, 1 - vloss)
+                np.add.at(tree.W, path, value + vloss)
+                # update root N
+                tree.N[0] += 1
+            done += len(leaves)
         # return action distribution
-        moves, visits = zip(*[(move, child.N) for move, child in self.root.children.items()])
-        probs = softmax(visits)
-        return list(zip(moves, probs))
+        root_children = tree.children(0)
+        if not root_children:
+            return []  # terminal position: no moves
+        probs = softmax(tree.N[root_children.start:root_children.stop])
+        return list(zip([tree.moves[i] for i in root_children], probs))
+
+    def update_with_move(self, move):
+        """Advance the root past a played move (ours or the opponent's). The next search
+           starts from the matching subtree with its statistics, or from scratch if that
+           move was never expanded. The next search must get the position after move."""
+        tree = self.next_tree if self.next_tree is not None else self.tree
+        self.next_tree = None
+        if tree is None:
+            return
+        for node in tree.children(0):
+            if tree.moves[node] == move:
+                if tree.n_children[node] > 0:
+                    self.next_tree = tree.subtree(node)
+                return
 
     def get_best_move(self, temperature=1e-3):
         """Return the move with highest visit count if temperature low, else sample."""
-        visits = [(move, child.N) for move, child in self.root.children.items()]
-        moves, Ns = zip(*visits)
+        tree = self.tree
+        root_children = tree.children(0)
+        moves = [tree.moves[i] for i in root_children]
+        Ns = tree.N[root_children.start:root_children.stop]
         if temperature < 1e-3:
-            best = moves[Ns.index(max(Ns))]
-            return best
-        else:
-            dist = softmax([n**(1/temperature) for n in Ns])
-            # sample
-            import random
-            return random.choices(moves, weights=dist)[0]
+            return moves[int(Ns.argmax())]
+        # pi ~ N^(1/t); scaled by max(N) first so the power cannot overflow for small t
+        top = Ns.max()
+        if top == 0:
+            return moves[np.random.randint(len(moves))]
+        probs = (Ns / top) ** (1.0 / temperature)
+        idx = np.searchsorted(np.cumsum(probs), np.random.random() * probs.sum(), side='right')
+        return moves[min(idx, len(moves) - 1)]
@@ -1,6 +1,7 @@
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from torch.nn.utils.fusion import fuse_conv_bn_eval
 
 class PolicyValueNet(nn.Module):
     """
@@ -40,3 +41,78 @@ class PolicyValueNet(nn.Module):
         v = F.relu(self.value_fc1(flat))
         value = torch.tanh(self.value_fc2(v)).squeeze(-1)
         return policy_logits, value
+
+    def fuse_for_inference(self):
+        """
+        Switches to eval mode and folds each BatchNorm into the preceding conv,
+        so every block runs as a single conv + relu. Inference only: the fused
+        model can no longer be trained. Returns self.
+        """
+        self.eval()
+        for conv_name, bn_name in (('conv1', 'bn1'), ('conv2', 'bn2'), ('conv3', 'bn3')):
+            fused = fuse_conv_bn_eval(getattr(self, conv_name), getattr(self, bn_name))
+            setattr(self, conv_name, fused)
+            setattr(self, bn_name, nn.Identity())
+        return self
+
+    @torch.inference_mode()
+    def predict(self, x):
+        """
+        Evaluation for search: no autograd bookkeeping.
+        Returns (policy_probs (batch, action_size), value (batch,)).
+        """
+        policy_logits, value = self(x)
+        return F.softmax(policy_logits, dim=-1), value
+
+class DevicePredictor:
+    """
+    Batched inference on a device (CUDA if available). Inputs go through a pinned host
+    staging buffer and are copied to the GPU asynchronously on a side stream, so the
+    default stream and the CPU side of the search are not blocked by the transfer.
+    On CUDA the model runs in FP16 and, if available, through torch.compile: the 6x6
+    net is launch-bound, so fewer and cheaper kernels matter more than FLOPs.
+    Without CUDA it simply runs predict on the CPU.
+    """
+    def __init__(self, model, max_batch, device=None, half=True, use_compile=True):
+        if device is None:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.device = torch.device(device)
+        self.model = model.to(self.device).eval()
+        use_cuda = self.device.type == 'cuda'
+        shape = (max_batch, model.conv1.in_channels, model.board_size, model.board_size)
+        self.staging = torch.empty(shape, pin_memory=use_cuda)
+        self.stream = torch.cuda.Stream(self.device) if use_cuda else None
+        self.half = half and use_cuda
+        if self.half:
+            self.model = self.model.half()
+        self.forward = self.model
+        if use_cuda and use_compile and hasattr(torch, 'compile'):
+            self.forward = torch.compile(self.model, mode='reduce-overhead')
+
+    def __call__(self, batch):
+        """
+        batch: float32 tensor (B, C, H, W) with B <= max_batch, e.g. from encode_batch.
+        Returns float32 numpy (policy_probs (B, action_size), value (B,)).
+        """
+        x = self.staging[:len(batch)]
+        x.copy_(batch)
+        if self.stream is None:
+            policy, value = self.model.predict(x)
+        else:
+            with torch.cuda.stream(self.stream), torch.inference_mode():
+                x = x.to(self.device, non_blocking=True)
+                policy_logits, value = self.forward(x.half() if self.half else x)
+                # softmax in float32: FP16 logits lose the small priors
+                policy = F.softmax(policy_logits.float(), dim=-1)
+                # .cpu() waits for the stream, so the staging buffer is free on return
+                policy, value = policy.cpu(), value.float().cpu()
+        return policy.numpy(), value.numpy()
+
+def quantize_for_cpu(model):
+    """
+    Returns an int8 copy of the model for CPU inference: dynamic quantization of the
+    Linear layers (policy_fc alone holds most of the weights). Conv layers stay float,
+    quantize_dynamic has no Conv2d kernels. The original model is left unchanged.
+    """
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
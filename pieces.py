@@ -3,7 +3,7 @@ try:
     import pygame
 except Exception:
     pygame = None  # Allow headless import without pygame
-from config import SQUARE_SIZE, WHITE, BLACK, PIECE_BG_COLORS
+from config import BOARD_SIZE, SQUARE_SIZE, WHITE, BLACK, PIECE_BG_COLORS
 
 # --- Piece Representation ---
 EMPTY_SQUARE = '.'
@@ -43,6 +43,34 @@ STRAIGHT_MOVES = [(1, 0), (-1, 0), (0, 1), (0, -1)]
 KING_MOVES = DIAGONAL_MOVES + STRAIGHT_MOVES
 
 
+# --- Precomputed Target Tables ---
+# TABLE[r][f] строится один раз при импорте: генерация ходов и проверка атак
+# перебирают готовые клетки без is_on_board на каждом шаге
+def _build_targets(deltas):
+    """Для каждой клетки - кортеж клеток на доске, куда ведут прыжки deltas."""
+    return [[tuple((r + dr, f + df) for dr, df in deltas
+                   if 0 <= r + dr < BOARD_SIZE and 0 <= f + df < BOARD_SIZE)
+             for f in range(BOARD_SIZE)] for r in range(BOARD_SIZE)]
+
+def _build_rays(directions):
+    """Для каждой клетки - кортеж лучей (клетки от ближней к дальней), пустые лучи опущены."""
+    def ray(r, f, dr, df):
+        cells = []
+        r, f = r + dr, f + df
+        while 0 <= r < BOARD_SIZE and 0 <= f < BOARD_SIZE:
+            cells.append((r, f))
+            r, f = r + dr, f + df
+        return tuple(cells)
+    return [[tuple(cells for cells in (ray(r, f, dr, df) for dr, df in directions) if cells)
+             for f in range(BOARD_SIZE)] for r in range(BOARD_SIZE)]
+
+KNIGHT_TARGETS = _build_targets(KNIGHT_MOVES)
+KING_TARGETS = _build_targets(KING_MOVES)
+DIAGONAL_RAYS = _build_rays(DIAGONAL_MOVES)
+STRAIGHT_RAYS = _build_rays(STRAIGHT_MOVES)
+QUEEN_RAYS = _build_rays(DIAGONAL_MOVES + STRAIGHT_MOVES)
+
+
 # --- Primitive Drawing Functions (OBSOLETE - Removed) ---
 # def draw_pawn(surface, color, is_white):
 #     """Рисует пешку (простой дизайн)."""
@@ -1517,19 +1517,20 @@ def play_game(page):
 
 
 def print_board(gs):
-    """Print the board state to console."""
-    print("     a b c d e f")
+    """Print the board state to console (one write for the whole block)."""
+    lines = ["     a b c d e f"]
     for row in range(BOARD_SIZE):
         rank = BOARD_SIZE - row
         pieces = ' '.join(gs.board[row])
-        print(f"  {rank}  {pieces}")
+        lines.append(f"  {rank}  {pieces}")
     
     w_hand = {k: v for k, v in gs.hands['w'].items() if v > 0}
     b_hand = {k: v for k, v in gs.hands['b'].items() if v > 0}
     if w_hand:
-        print(f"  White hand: {w_hand}")
+        lines.append(f"  White hand: {w_hand}")
     if b_hand:
-        print(f"  Black hand: {b_hand}")
+        lines.append(f"  Black hand: {b_hand}")
+    print('\n'.join(lines))
 
 
 # ── Main ────────────────────────────────────────────────────
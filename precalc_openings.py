@@ -12,6 +12,7 @@ Estimated time: ~2 hours on 8-core Mac
 import sys
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -21,6 +22,10 @@ from ai import find_best_move, save_move_cache_to_db, load_move_cache_from_db, g
 
 DEPTH = 10  # Rust engine can handle depth 10 in ~4s per position
 TIME_LIMIT = None  # No time limit — full quality search
+# Positions searched at once. find_best_move releases the GIL, so plain threads run the
+# Rust searches in parallel, and they all share the engine's move cache. Capped so that
+# the engine's own rayon pool (root splitting) is not oversubscribed cpu_count ways.
+WORKERS = min(4, os.cpu_count() or 1)
 
 
 def format_move(m):
@@ -53,6 +58,36 @@ def calc_position(gs, label):
     return best, 0, elapsed
 
 
+def run_jobs(fn, jobs, save_every):
+    """Runs fn(gs, label) for each job on WORKERS threads, results in job order.
+    Saves the cache after every save_every finished jobs, so an interrupted run keeps its work."""
+    results = [None] * len(jobs)
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        futures = {pool.submit(fn, *job): i for i, job in enumerate(jobs)}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if done % save_every == 0:
+                save_move_cache_to_db()
+                print(f"  💾 Saved cache")
+    return results
+
+
+def calc_positions(jobs, save_every=5):
+    """calc_position for each (gs, label), see run_jobs."""
+    return run_jobs(calc_position, jobs, save_every)
+
+
+def calc_reply_line(gs, label):
+    """White's best move in gs, then Black's reply to it (Level 2b + Level 3)."""
+    w2_best, _, t = calc_position(gs, label)
+    if not w2_best:
+        return [t]
+    gs3 = gs.copy()
+    gs3.make_move(w2_best)
+    _, _, t3 = calc_position(gs3, f"  └─ After w2:{format_move(w2_best)} — Black")
+    return [t, t3]
+
+
 def make_start_gs():
     """Create a GameState with the standard minihouse starting position.
     Must match how play_online.py builds the board (including Q in hands)."""
@@ -77,6 +112,7 @@ def main():
     gs0 = make_start_gs()
     total_positions = 0
     total_time = 0
+    wall_start = time.time()
     
     # ═══════════════════════════════════════════
     # LEVEL 0: Starting position (white to move)
@@ -102,12 +138,13 @@ def main():
     
     level1_positions = []  # (white_move, black_response, gamestate_after_both)
     
+    jobs = []
     for i, wmove in enumerate(white_moves):
         gs1 = gs0.copy()
         gs1.make_move(wmove)
-        
-        label = f"[{i+1}/{len(white_moves)}] After w:{format_move(wmove)} — Black"
-        black_best, _, t = calc_position(gs1, label)
+        jobs.append((gs1, f"[{i+1}/{len(white_moves)}] After w:{format_move(wmove)} — Black"))
+    
+    for wmove, (gs1, _), (black_best, _, t) in zip(white_moves, jobs, calc_positions(jobs)):
         total_time += t
         total_positions += 1
         
@@ -115,11 +152,6 @@ def main():
             gs2 = gs1.copy()
             gs2.make_move(black_best)
             level1_positions.append((wmove, black_best, gs2))
-        
-        # Save periodically
-        if (i + 1) % 5 == 0:
-            save_move_cache_to_db()
-            print(f"  💾 Saved cache")
     
     save_move_cache_to_db()
     print(f"  💾 Saved cache")
@@ -131,15 +163,11 @@ def main():
     print(f"LEVEL 2: White's 2nd move for {len(level1_positions)} (w1,b1) combinations")
     print("═" * 60)
     
-    for i, (wmove, bmove, gs2) in enumerate(level1_positions):
-        label = f"[{i+1}/{len(level1_positions)}] After w:{format_move(wmove)} b:{format_move(bmove)} — White"
-        white2_best, _, t = calc_position(gs2, label)
+    jobs = [(gs2, f"[{i+1}/{len(level1_positions)}] After w:{format_move(wmove)} b:{format_move(bmove)} — White")
+            for i, (wmove, bmove, gs2) in enumerate(level1_positions)]
+    for _, _, t in calc_positions(jobs):
         total_time += t
         total_positions += 1
-        
-        if (i + 1) % 5 == 0:
-            save_move_cache_to_db()
-            print(f"  💾 Saved cache")
     
     save_move_cache_to_db()
     
@@ -156,27 +184,16 @@ def main():
               f"calc white's 2nd move for ALL {len(black_moves)} black responses")
         print("═" * 60)
         
+        jobs = []
         for i, bmove in enumerate(black_moves):
             gs2b = gs_after_best_white.copy()
             gs2b.make_move(bmove)
-            
-            label = f"[{i+1}/{len(black_moves)}] After w:{format_move(white_best)} b:{format_move(bmove)} — White"
-            w2_best, _, t = calc_position(gs2b, label)
-            total_time += t
-            total_positions += 1
-            
-            # LEVEL 3: For this white 2nd move, what does black respond?
-            if w2_best:
-                gs3 = gs2b.copy()
-                gs3.make_move(w2_best)
-                label3 = f"  └─ After w2:{format_move(w2_best)} — Black"
-                b2_best, _, t = calc_position(gs3, label3)
-                total_time += t
-                total_positions += 1
-            
-            if (i + 1) % 3 == 0:
-                save_move_cache_to_db()
-                print(f"  💾 Saved cache")
+            jobs.append((gs2b, f"[{i+1}/{len(black_moves)}] After w:{format_move(white_best)} b:{format_move(bmove)} — White"))
+        
+        # LEVEL 3: each job also searches Black's reply to the white 2nd move it found
+        for times in run_jobs(calc_reply_line, jobs, save_every=3):
+            total_time += sum(times)
+            total_positions += len(times)
         
         save_move_cache_to_db()
     
@@ -187,6 +204,8 @@ def main():
     print(f"✅ PRECALCULATION COMPLETE")
     print(f"   Positions calculated: {total_positions}")
     print(f"   Total time: {total_time:.0f}s ({total_time/60:.1f} min)")
+    wall_time = time.time() - wall_start
+    print(f"   Wall time: {wall_time:.0f}s ({wall_time/60:.1f} min), {WORKERS} workers")
     print(f"   Cache size: see move_cache.db")
     print("═" * 60)
 
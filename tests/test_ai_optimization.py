@@ -63,12 +63,13 @@ def test_ai_search():
     gs.setup_initial_board()
     
     start_time = time.time()
+    stats = {}
     # Depth 2 should be fast but exercise the recursion and parallel logic
-    best_move = ai.find_best_move(gs, depth=2)
+    best_move = ai.find_best_move(gs, depth=2, stats=stats)
     duration = time.time() - start_time
     
     print(f"AI returned move: {best_move}")
-    print(f"Time taken: {duration:.4f}s")
+    print(f"Time taken: {duration:.4f}s, nodes: {stats['nodes']}")
     
     assert best_move is not None, "AI did not return a move"
     print("PASS: AI found a move.")
@@ -118,12 +119,13 @@ def test_search_speed():
     gs.setup_initial_board()
     
     ai.tt.clear()
+    stats = {}
     start = time.time()
     score, best_move = ai.minimax_alpha_beta(
-        gs, 6, -float('inf'), float('inf'), True)
+        gs, 6, -float('inf'), float('inf'), True, stats=stats)
     elapsed = time.time() - start
     
-    print(f"Depth 6: move={best_move}, score={score}, time={elapsed:.2f}s")
+    print(f"Depth 6: move={best_move}, score={score}, time={elapsed:.2f}s, nodes={stats['nodes']}")
     assert best_move is not None, "No move found at depth 6"
     assert elapsed < 30, f"Depth 6 took {elapsed:.2f}s, expected <30s"
     print(f"PASS: Depth 6 completed in {elapsed:.2f}s.")
@@ -0,0 +1,83 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gamestate import GameState
+
+
+def _random_walk(seed, games, plies):
+    """Yields the state after every make/undo of random self-play games."""
+    rng = random.Random(seed)
+    for _ in range(games):
+        gs = GameState()
+        gs.setup_initial_board()
+        start_key = gs.zobrist_key
+        depth = 0
+        for _ in range(plies):
+            moves = gs.get_all_legal_moves()
+            if not moves:
+                break
+            gs.make_ai_move(rng.choice(moves))
+            depth += 1
+            yield gs
+            if rng.random() < 0.2:
+                gs.undo_ai_move()
+                depth -= 1
+                yield gs
+        while depth:
+            gs.undo_ai_move()
+            depth -= 1
+        assert gs.zobrist_key == start_key, "Key not restored after undoing the whole game"
+
+
+def test_incremental_zobrist_matches_full_recompute():
+    plies = 0
+    for gs in _random_walk(seed=3, games=60, plies=80):
+        assert gs.zobrist_key == gs._compute_zobrist_key()
+        plies += 1
+    assert plies > 1000
+
+
+def test_copies_keep_zobrist_key():
+    for gs in _random_walk(seed=5, games=10, plies=60):
+        key = gs.zobrist_key
+        for copy_state in (gs.copy(), gs.fast_clone(), gs.fast_copy_for_simulation()):
+            assert copy_state.zobrist_key == key
+            assert copy_state._compute_zobrist_key() == key
+
+
+def test_zobrist_key_tracks_make_move_and_undo():
+    gs = GameState()
+    gs.setup_initial_board()  # saves the initial state for undo
+    start_key = gs.zobrist_key
+    move = gs.get_all_legal_moves()[0]
+    assert gs.make_move(move)
+    gs.save_state()
+    assert gs.zobrist_key != start_key
+    assert gs.zobrist_key == gs._compute_zobrist_key()
+    assert gs.undo_move()
+    assert gs.zobrist_key == start_key
+
+
+def test_key_stays_lazy_until_requested():
+    rng = random.Random(11)
+    gs = GameState()
+    gs.setup_initial_board()
+    assert gs.make_move(gs.get_all_legal_moves()[0])
+    gs.get_all_legal_moves()
+    assert gs._hash_cache is None, "Legality probes computed the key"
+    # AI moves made before the first request are picked up by the full computation
+    for _ in range(6):
+        gs.make_ai_move(rng.choice(gs.get_all_legal_moves()))
+    assert gs._hash_cache is None
+    assert gs.zobrist_key == gs._compute_zobrist_key()
+    # from here on it is updated incrementally, and undo past the first request drops it again
+    for _ in range(6):
+        gs.make_ai_move(rng.choice(gs.get_all_legal_moves()))
+        assert gs._hash_cache == gs._compute_zobrist_key()
+    for _ in range(12):
+        gs.undo_ai_move()
+    assert gs._hash_cache is None
+    assert gs.zobrist_key == gs._compute_zobrist_key()
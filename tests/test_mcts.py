@@ -0,0 +1,116 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gamestate import GameState
+from nn.mcts import MCTS
+
+
+class UniformPolicy:
+    """policy_value_fn stand-in: uniform priors over legal moves, value from a seeded RNG.
+       Records the size of every batch it is called with."""
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.batches = []
+
+    def __call__(self, states):
+        self.batches.append(len(states))
+        results = []
+        for state in states:
+            moves = state.get_all_legal_moves()
+            probs = [1.0 / len(moves)] * len(moves) if moves else []
+            results.append((list(zip(moves, probs)), self.rng.uniform(-1, 1)))
+        return results
+
+
+def _snapshot(gs):
+    return ([row[:] for row in gs.board], {c: dict(h) for c, h in gs.hands.items()},
+            gs.current_turn, dict(gs.king_pos), set(gs.promoted_pieces))
+
+
+def _root_stats(tree):
+    children = tree.children(0)
+    return int(tree.N[0]), int(tree.N[children.start:children.stop].sum())
+
+
+def _new_game():
+    gs = GameState()
+    gs.setup_initial_board()
+    return gs
+
+
+def test_search_restores_state_and_returns_distribution():
+    gs = _new_game()
+    gs.make_ai_move(gs.get_all_legal_moves()[3])
+    before = _snapshot(gs)
+    mcts = MCTS(UniformPolicy(), n_iters=120, batch_size=16)
+    result = mcts.search(gs)
+    assert _snapshot(gs) == before
+    assert [m for m, _p in result] == gs.get_all_legal_moves()
+    assert sum(p for _m, p in result) == pytest.approx(1.0)
+    assert mcts.get_best_move(temperature=0) in gs.get_all_legal_moves()
+
+
+def test_root_is_expanded_alone_and_visits_add_up():
+    policy = UniformPolicy()
+    mcts = MCTS(policy, n_iters=200, batch_size=16)
+    mcts.search(_new_game())
+    # one root evaluation, then full batches for the remaining 199 simulations
+    assert policy.batches[0] == 1
+    assert sum(policy.batches) == 200
+    root_n, children_n = _root_stats(mcts.tree)
+    assert root_n == 200
+    assert root_n == children_n + 1
+
+
+def test_update_with_move_reuses_subtree():
+    gs = _new_game()
+    mcts = MCTS(UniformPolicy(), n_iters=200, batch_size=8)
+    mcts.search(gs)
+    move = mcts.get_best_move()
+    played = next(i for i in mcts.tree.children(0) if mcts.tree.moves[i] == move)
+    kept_visits = int(mcts.tree.N[played])
+
+    mcts.update_with_move(move)
+    assert mcts.next_tree is not None
+    assert _root_stats(mcts.next_tree)[0] == kept_visits
+
+    gs.make_ai_move(move)
+    before = _snapshot(gs)
+    result = mcts.search(gs)
+    assert _snapshot(gs) == before
+    assert [m for m, _p in result] == gs.get_all_legal_moves()
+    root_n, children_n = _root_stats(mcts.tree)
+    assert root_n == kept_visits + 200
+    assert root_n == children_n + 1
+    assert mcts.next_tree is None
+
+
+def test_update_with_unexpanded_opponent_move_starts_fresh():
+    gs = _new_game()
+    mcts = MCTS(UniformPolicy(), n_iters=40, batch_size=8)
+    mcts.search(gs)
+    move = mcts.get_best_move()
+    mcts.update_with_move(move)
+    gs.make_ai_move(move)
+    subtree = mcts.next_tree
+    assert subtree is not None
+    # an opponent reply the search never expanded
+    reply = next(subtree.moves[i] for i in subtree.children(0) if subtree.n_children[i] == 0)
+
+    mcts.update_with_move(reply)
+    assert mcts.next_tree is None
+    gs.make_ai_move(reply)
+    result = mcts.search(gs)
+    assert [m for m, _p in result] == gs.get_all_legal_moves()
+    assert _root_stats(mcts.tree)[0] == 40
+
+
+def test_update_with_move_before_any_search_is_a_no_op():
+    mcts = MCTS(UniformPolicy(), n_iters=10)
+    mcts.update_with_move(((5, 0), (4, 0), None))
+    assert mcts.next_tree is None
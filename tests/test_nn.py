@@ -0,0 +1,119 @@
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import BOARD_SIZE
+from gamestate import GameState
+from pieces import EMPTY_SQUARE
+from engine.env import (encode_state, encode_batch, move_to_action, make_policy_value_fn,
+                        NUM_PLANES)
+from nn.model import PolicyValueNet, DevicePredictor, quantize_for_cpu
+
+
+def _reference_encoding(state):
+    """The per-square loop MiniChessEnv._get_observation used before vectorization."""
+    board = state.board
+    size = len(board)
+    obs = np.zeros((NUM_PLANES, size, size), dtype=np.float32)
+    piece_map = {'P': 0, 'N': 1, 'B': 2, 'R': 3, 'Q': 4, 'K': 5}
+    for r in range(size):
+        for c in range(size):
+            p = board[r][c]
+            if p == EMPTY_SQUARE:
+                continue
+            plane = piece_map[p.upper()] + (0 if p.isupper() else 6)
+            obs[plane, r, c] = 1.0
+    obs[12, :, :] = 1.0 if state.current_turn == 'w' else 0.0
+    return obs
+
+
+def _random_positions(seed, games=20, plies=60):
+    rng = random.Random(seed)
+    for _ in range(games):
+        gs = GameState()
+        gs.setup_initial_board()
+        yield gs.fast_copy_for_simulation()
+        for _ in range(plies):
+            moves = gs.get_all_legal_moves()
+            if not moves:
+                break
+            gs.make_ai_move(rng.choice(moves))
+            yield gs.fast_copy_for_simulation()
+
+
+def _model(seed=0):
+    """Small net with non-trivial BatchNorm statistics, in eval mode."""
+    torch.manual_seed(seed)
+    model = PolicyValueNet(BOARD_SIZE, hidden_dim=16)
+    for bn in (model.bn1, model.bn2, model.bn3):
+        bn.running_mean.uniform_(-0.5, 0.5)
+        bn.running_var.uniform_(0.5, 2.0)
+        bn.weight.data.uniform_(0.5, 1.5)
+        bn.bias.data.uniform_(-0.2, 0.2)
+    return model.eval()
+
+
+def _inputs(batch=16, seed=1):
+    generator = torch.Generator().manual_seed(seed)
+    return (torch.rand(batch, 13, BOARD_SIZE, BOARD_SIZE, generator=generator) > 0.8).float()
+
+
+def test_encode_state_matches_reference_loop():
+    states = list(_random_positions(seed=1))
+    assert len(states) > 500
+    for state in states:
+        np.testing.assert_array_equal(encode_state(state), _reference_encoding(state))
+    batch = encode_batch(states[:8])
+    assert batch.shape == (8, NUM_PLANES, BOARD_SIZE, BOARD_SIZE)
+    assert batch.dtype == torch.float32
+
+
+def test_move_to_action_is_unique_per_board_move():
+    squares = [(r, f) for r in range(BOARD_SIZE) for f in range(BOARD_SIZE)]
+    actions = {move_to_action((a, b, None), BOARD_SIZE) for a in squares for b in squares if a != b}
+    drops = {move_to_action(('drop', 'wN', sq), BOARD_SIZE) for sq in squares}
+    assert len(actions) == len(squares) * (len(squares) - 1)
+    assert len(drops) == len(squares)
+    assert not actions & drops
+    assert max(actions | drops) < BOARD_SIZE ** 4
+
+
+def test_policy_value_fn_priors_cover_legal_moves():
+    policy_value_fn = make_policy_value_fn(DevicePredictor(_model(), max_batch=16, device='cpu'))
+    states = list(_random_positions(seed=2, games=2, plies=8))[:16]
+    for state, (action_probs, value) in zip(states, policy_value_fn(states)):
+        assert [m for m, _p in action_probs] == state.get_all_legal_moves()
+        assert sum(p for _m, p in action_probs) == pytest.approx(1.0)
+        assert -1.0 <= value <= 1.0
+
+
+def test_fused_model_matches_unfused():
+    x = _inputs()
+    with torch.inference_mode():
+        logits, value = _model()(x)
+        fused = _model().fuse_for_inference()
+        fused_logits, fused_value = fused(x)
+    assert isinstance(fused.bn1, torch.nn.Identity)
+    torch.testing.assert_close(fused_logits, logits, atol=1e-5, rtol=1e-4)
+    torch.testing.assert_close(fused_value, value, atol=1e-5, rtol=1e-4)
+
+
+def test_quantized_model_keeps_original_and_output_shapes():
+    model = _model()
+    x = _inputs()
+    with torch.inference_mode():
+        logits, value = model(x)
+        quantized = quantize_for_cpu(model)
+        q_logits, q_value = quantized(x)
+        again_logits, _ = model(x)
+    assert isinstance(model.policy_fc, torch.nn.Linear)
+    torch.testing.assert_close(again_logits, logits)
+    assert q_logits.shape == logits.shape and q_value.shape == value.shape
+    assert (q_value - value).abs().max().item() < 0.1
@@ -1,54 +1,92 @@
 # -*- coding: utf-8 -*-
+import os
 import threading
-import copy
 import time
 import traceback
+try:
+    import pygame
+except ImportError:
+    pygame = None  # Headless use (scripts, tests): no GUI loop to wake up
 from ai import find_best_move
 from utils import format_move_for_print
 
+# Posted when an AI/hint thread finishes, wakes main() from pygame.event.wait
+AI_DONE_EVENT = pygame.USEREVENT + 1 if pygame is not None else None
+# Progress output of the AI threads (DEBUG_AI=1), read once at import
+DEBUG_AI = os.environ.get('DEBUG_AI', '') not in ('', '0')
+
+
+def _notify_done(thread):
+    """Marks the thread finished and wakes the GUI loop."""
+    thread.finished.set()
+    if pygame is None:
+        return
+    try:
+        pygame.event.post(pygame.event.Event(AI_DONE_EVENT, thread=thread))
+    except pygame.error:
+        pass  # No display (headless use): nobody waits on the event queue
+
 
 class AIThread(threading.Thread):
     def __init__(self, gamestate, depth):
         threading.Thread.__init__(self)
-        self.gamestate = copy.deepcopy(gamestate)
+        self.gamestate = gamestate.fast_clone()
         self.depth = depth
         self.best_move = None
-        self.done = False
-        self.name = f"AIThread-{gamestate.current_turn}-D{depth:.0f}-Move-{time.time():.0f}"
+        self.finished = threading.Event()
+        self._name_parts = (gamestate.current_turn, depth, time.time())
         self.daemon = True
 
+    def label(self):
+        """Descriptive name for log output, formatted only when printed."""
+        turn, depth, started = self._name_parts
+        return f"AIThread-{turn}-D{depth:.0f}-Move-{started:.0f}"
+
     def run(self):
         try:
-            task_type = 'move'
-            print(f"Starting AI {task_type} calculation in thread: {self.name}")
-
+            if DEBUG_AI:
+                print(f"Starting AI move calculation in thread: {self.label()}")
             self.best_move = find_best_move(self.gamestate, self.depth)
-            move_str = format_move_for_print(self.best_move)
-            print(f"AI thread {self.name} finished. Best {task_type}: {move_str}")
+            if DEBUG_AI:
+                move_str = format_move_for_print(self.best_move)
+                print(f"AI thread {self.label()} finished. Best move: {move_str}")
         except Exception as e:
-            print(f"!!! EXCEPTION in AI thread {self.name}: {e}")
+            print(f"!!! EXCEPTION in AI thread {self.label()}: {e}")
             traceback.print_exc()
             self.best_move = None
         finally:
-            self.done = True
+            _notify_done(self)
+
+    @property
+    def done(self):
+        return self.finished.is_set()
 
 
 class HintThread(threading.Thread):
     """Background thread to calculate the best move hint for the current position."""
     def __init__(self, gamestate, depth=8):
         threading.Thread.__init__(self)
-        self.gamestate = copy.deepcopy(gamestate)
+        self.gamestate = gamestate.fast_clone()
         self.depth = depth
         self.best_move = None
-        self.done = False
+        self.finished = threading.Event()
         self.daemon = True
-        self.name = f"HintThread-{gamestate.current_turn}-{time.time():.0f}"
+        self._name_parts = (gamestate.current_turn, time.time())
+
+    def label(self):
+        """Descriptive name for log output, formatted only when printed."""
+        turn, started = self._name_parts
+        return f"HintThread-{turn}-{started:.0f}"
 
     def run(self):
         try:
             self.best_move = find_best_move(self.gamestate, self.depth)
         except Exception as e:
-            print(f"HintThread error: {e}")
+            print(f"{self.label()} error: {e}")
             self.best_move = None
         finally:
-            self.done = True
+            _notify_done(self)
+
+    @property
+    def done(self):
+        return self.finished.is_set()
@@ -3,32 +3,32 @@ from config import BOARD_SIZE
 from pieces import EMPTY_SQUARE
 
 # --- Helper Functions ---
-def get_piece_color(piece):
-    if piece == EMPTY_SQUARE: return None
+# Константы модуля привязаны как значения по умолчанию (_size, _empty, ...): в теле
+# это LOAD_FAST вместо поиска в globals на каждый вызов. Передавать их не нужно.
+def get_piece_color(piece, _empty=EMPTY_SQUARE):
+    if piece == _empty: return None
     return 'w' if piece.isupper() else 'b'
 
-def is_on_board(r, f):
-    return 0 <= r < BOARD_SIZE and 0 <= f < BOARD_SIZE
-
-def coords_to_algebraic(r, f):
-    if not is_on_board(r,f): return "??"
-    rank = BOARD_SIZE - 1 - r
-    file = f
-    return chr(ord('a') + file) + str(rank + 1)
-
-def algebraic_to_coords(alg):
-    if not isinstance(alg, str) or len(alg) != 2: return None
-    file_char, rank_char = alg[0], alg[1]
-    # Adjust check for file based on BOARD_SIZE
-    max_file_char = chr(ord('a') + BOARD_SIZE - 1)
-    max_rank_char = str(BOARD_SIZE)
-    if not (('a' <= file_char <= max_file_char) and ('1' <= rank_char <= max_rank_char)): return None
-
-    file = ord(file_char) - ord('a')
-    rank = int(rank_char) - 1
-    internal_rank = BOARD_SIZE - 1 - rank
-    if not is_on_board(internal_rank, file): return None # Should be redundant but safe
-    return internal_rank, file
+# Цвет по символу клетки: в циклах генерации ходов поиск в dict вместо вызова get_piece_color
+PIECE_COLOR = {EMPTY_SQUARE: None}
+PIECE_COLOR.update((p, 'w') for p in 'PNBRQK')
+PIECE_COLOR.update((p, 'b') for p in 'pnbrqk')
+
+def is_on_board(r, f, _size=BOARD_SIZE):
+    return 0 <= r < _size and 0 <= f < _size
+
+# Названия всех клеток заранее: индекс/поиск в dict вместо chr/ord на каждый вызов
+_ALGEBRAIC = [[chr(ord('a') + f) + str(BOARD_SIZE - r) for f in range(BOARD_SIZE)]
+              for r in range(BOARD_SIZE)]
+_COORDS_BY_ALGEBRAIC = {_ALGEBRAIC[r][f]: (r, f) for r in range(BOARD_SIZE) for f in range(BOARD_SIZE)}
+
+def coords_to_algebraic(r, f, _size=BOARD_SIZE, _names=_ALGEBRAIC):
+    if not (0 <= r < _size and 0 <= f < _size): return "??"
+    return _names[r][f]
+
+def algebraic_to_coords(alg, _coords=_COORDS_BY_ALGEBRAIC):
+    if not isinstance(alg, str): return None
+    return _coords.get(alg)
 
 def piece_to_lower(piece_type): return piece_type.lower()
 def piece_to_upper(piece_type): return piece_type.upper()
@@ -47,13 +47,8 @@ def format_move_for_print(move):
         return s
 
 def is_same_move(move1, move2):
-    """Проверяет, совпадают ли два хода (игнорируя дополнительные детали)"""
+    """Проверяет, совпадают ли два хода (фигура превращения не учитывается).
+       Ходы - кортежи ('drop', 'wN', (r, f)) или ((r1, f1), (r2, f2), promotion)."""
     if not move1 or not move2: return False
-    if move1[0] == 'drop' and move2[0] == 'drop':
-        return move1[1] == move2[1] and move1[2] == move2[2]
-    elif move1[0] != 'drop' and move2[0] != 'drop':
-        # Check if both are tuple-like (start, end, promotion)
-        if isinstance(move1[0], tuple) and isinstance(move2[0], tuple) and \
-           isinstance(move1[1], tuple) and isinstance(move2[1], tuple):
-             return move1[0] == move2[0] and move1[1] == move2[1]
-    return False
\ No newline at end of file
+    return move1[0] == move2[0] and move1[1] == move2[1] and \
+           (move1[0] != 'drop' or move1[2] == move2[2])